@@ -1,28 +1,69 @@
+import os
+import warnings
 import datetime as dt
 import numpy as np
 import pandas as pd
 from flask import Flask, jsonify
 
-from sqlalchemy import create_engine, func as F
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy.ext.automap import automap_base
 
 import utils
+import migrate
 
 
-# SQL engine and session
-engine = create_engine('sqlite:///hi-weather/hawaii.sqlite')
-session = Session(engine)
+# Database settings
+DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'hawaii.sqlite')
+POOL_SIZE = 8 # pooled connections per process (1 per concurrent request)
+CACHE_SIZE = 256 # cached responses per process
+COLUMNAR = False # serve the routes from in-memory NumPy arrays instead of SQL queries
+
+# SQL engine with a pool of read-only connections
+engine = utils.create_read_engine(DB_PATH, pool_size=POOL_SIZE)
+if migrate.missing_indexes(DB_PATH):
+    warnings.warn(f'{DB_PATH} is missing the indexes for date range queries, which will scan the '
+                  'whole table. Run `python migrate.py` to create them.')
 
 # Reflect db tables
 Base = automap_base()
 Base.prepare(engine, reflect=True)
 M, S = Base.classes
+engine.dispose() # no open connections to share with forked server workers
+
+# Session per request (or thread), removed when the request ends
+session = scoped_session(sessionmaker(bind=engine))
+
+# Date bounds and station counts, requeried only when the database changes
+metadata = utils.MetadataCache(DB_PATH, M)
+
+# Daily temperature rollups, rebuilt when the database changes
+temp_rollup = utils.TempRollup(M, metadata.version)
+
+# In-memory arrays of the measurement data, reloaded when the database changes
+columnar = utils.ColumnarStore(DB_PATH, metadata.version) if COLUMNAR else None
+
+# Serialized responses with ETags, served until the database changes
+responses = utils.ResponseCache(metadata.version, maxsize=CACHE_SIZE)
 
 # Flask app
 app = Flask(__name__)
 
 
+@app.teardown_appcontext
+def remove_session(exception=None):
+
+    """ Close the request's session, returning its connection to the pool """
+
+    session.remove()
+
+
+def get_metadata():
+
+    """ Date bounds and station counts, from the in-memory arrays if enabled """
+
+    return columnar.metadata() if columnar is not None else metadata.get(session)
+
+
 """ App Routes """
 
 
@@ -43,62 +84,74 @@ def home():
 
 
 @app.route('/api/v1.0/precipitation')
+@responses.cached
 def precipitation():
 
     """ Precipitation data from the last 12 months """
 
-    start, _ = utils.get_date_range(session=session, table=M, n_days=365) # get start date
-    prcp_12m = session.query(M.date, M.prcp).filter(M.date >= start).all() # query precipitation
+    bounds = get_metadata()['date_bounds'] # first and last dates
+    start, _ = utils.get_date_range(session=session, table=M, n_days=365, bounds=bounds) # get start date
+    if columnar is not None:
+        prcp_12m = columnar.precipitation(start) # slice precipitation
+    else:
+        prcp_12m = session.query(M.date, M.prcp).filter(M.date >= start).all() # query precipitation
     prcp_json = jsonify(Description='Precipitation in the last 12 months',
                         _Data={date: prcp for date, prcp in prcp_12m}) # convert to json
-    session.rollback() # rollback session transaction before returning
     return prcp_json
 
 
 @app.route('/api/v1.0/stations')
+@responses.cached
 def stations():
 
     """ Measurement count from each station """
 
-    stations = utils.count_by_station(session=session, table=M) # query measurement counts
+    stations = get_metadata()['stations'] # measurement counts
     stations_json = jsonify(Description='Weather stations and number of measurements recorded',
                             _Data={station: count for station, count in stations}) # convert to json
-    session.rollback() # rollback session transaction before returning
     return stations_json
 
 
 @app.route('/api/v1.0/tobs')
+@responses.cached
 def tobs():
     
     """ Most active station's temperature observations from the last 12 months """
 
-    start, _ = utils.get_date_range(session=session, table=M, n_days=365) # get start date
-    most_active = utils.count_by_station(session=session, table=M)[0][0] # most active station
+    meta = get_metadata()
+    start, _ = utils.get_date_range(session=session, table=M, n_days=365, 
+                                    bounds=meta['date_bounds']) # get start date
+    most_active = meta['most_active'] # most active station
 
     # Query the `tobs` data for this stations from the last 12 months
-    temps = session.query(M.date, M.tobs)
-    temps = temps.filter((M.station == most_active) & (M.date >= start)).all()
+    if columnar is not None:
+        temps = columnar.temps(most_active, start)
+    else:
+        temps = session.query(M.date, M.tobs)
+        temps = temps.filter((M.station == most_active) & (M.date >= start)).all()
 
     temps_json = jsonify(Description='Most active station\'s temperature in the last 12 months',
                          _Data={date: temp for date, temp in temps}) # convert to json
-    session.rollback() # rollback session transaction before returning
     return temps_json
 
 
 @app.route('/api/v1.0/temp/<start>')
 @app.route('/api/v1.0/temp/<start>/<end>')
+@responses.cached
 def temp_stats(start='start', end='end'):
 
     """ Minimum, average, and maximum temperature over the date range from the 
     start date to the end date """
 
     # Date range
-    start, end = utils.get_date_range(session=session, table=M, 
-                                      start_date=start, end_date=end)
+    start, end = utils.get_date_range(session=session, table=M, start_date=start, end_date=end, 
+                                      bounds=get_metadata()['date_bounds'])
 
-    # Query the data to calculate the 3 statistics over the date range
-    SELECT = [F.min(M.tobs), F.avg(M.tobs), F.max(M.tobs)] # min, avg, and max `tobs`
-    stats = session.query(*SELECT).filter((M.date >= start) & (M.date <= end)).first()
+    # Calculate the 3 statistics over the date range from the daily rollups (or arrays)
+    if columnar is not None:
+        stats = columnar.temp_stats(start, end) # min, avg, and max `tobs`
+    else:
+        stats = temp_rollup.stats(session, start, end) # min, avg, and max `tobs`
 
     # Convert query results to JSON
     stats_json = jsonify(
@@ -116,8 +169,6 @@ def temp_stats(start='start', end='end'):
             _5_max_temp=stats[2]
         )
     )
-
-    session.rollback() # rollback session transaction before returning
     return stats_json
 
 
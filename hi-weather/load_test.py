@@ -0,0 +1,163 @@
+import sys
+import time
+import logging
+import threading
+import urllib.request
+from http.client import HTTPException
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from werkzeug.serving import make_server
+
+
+# URLs requested in turn, covering the 4 API routes
+routes = [
+    '/api/v1.0/precipitation',
+    '/api/v1.0/stations',
+    '/api/v1.0/tobs',
+    '/api/v1.0/temp/start/end',
+    '/api/v1.0/temp/2015-01-01/2016-12-31',
+    '/api/v1.0/temp/2012-06-15/2012-07-15'
+]
+
+
+def serve(host='127.0.0.1', port=0):
+
+    """
+    Serve the Flask app from a background thread of this process, handling
+    each request in its own thread.
+
+    Parameters
+    ----------
+    host : str, optional
+        Host address, by default '127.0.0.1'
+    port : int, optional
+        Port, by default 0 (any free port)
+
+    Returns
+    -------
+    Werkzeug server
+        Running server (stop it with `shutdown()`)
+    Str
+        Base URL of the server
+    """
+
+    from app import app
+    logging.getLogger('werkzeug').setLevel(logging.ERROR) # don't log each request
+    server = make_server(host, port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://{host}:{server.server_port}'
+
+
+def get(url, timeout=30):
+
+    """
+    Request a URL and time the response.
+
+    Returns
+    -------
+    Float
+        Seconds until the full response was read
+    Int or None
+        Status code, or None if the request failed
+    """
+
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except (OSError, HTTPException) as e: # HTTP errors, and failed, reset, timed out, or cut off responses
+        status = getattr(e, 'code', None)
+    return time.perf_counter() - start, status
+
+
+def summarize(results, seconds):
+
+    """
+    Summarize the latency of each route.
+
+    Parameters
+    ----------
+    results : list[tuple(str, float, int)]
+        Route, seconds, and status code of each request
+    seconds : float
+        Wall time of the whole test
+
+    Returns
+    -------
+    Pandas dataframe
+        Requests, errors, p50, p99, and mean latency in milliseconds of each
+        route and of all routes, and requests per second overall
+    """
+
+    df = pd.DataFrame(results, columns=['route', 'seconds', 'status'])
+    df['ms'] = df['seconds'] * 1000
+
+    # Helper function to summarize a group of requests
+    def stats(group):
+        return pd.Series({'requests': len(group), 'errors': int((group['status'] != 200).sum()),
+                          'p50_ms': np.percentile(group['ms'], 50),
+                          'p99_ms': np.percentile(group['ms'], 99),
+                          'mean_ms': group['ms'].mean()})
+
+    summary = df.groupby('route', sort=False).apply(stats)
+    summary.loc['all'] = stats(df)
+    summary[['requests', 'errors']] = summary[['requests', 'errors']].astype(int)
+    summary['requests_per_sec'] = np.nan
+    summary.loc['all', 'requests_per_sec'] = len(df) / seconds
+    return summary
+
+
+def load_test(base_url=None, n_requests=2000, concurrency=16, routes=routes):
+
+    """
+    Hammer the API routes concurrently and report their p50/p99 latency.
+    Routes are requested in turn by `concurrency` client threads, after 1
+    warm-up request each.
+
+    Parameters
+    ----------
+    base_url : str, optional
+        Base URL of a running server (e.g. gunicorn at 'http://127.0.0.1:8000'),
+        by default None. If None, the app is served from this process (see
+        `serve()`).
+    n_requests : int, optional
+        Total number of requests, by default 2000
+    concurrency : int, optional
+        Number of concurrent client threads, by default 16
+    routes : list[str], optional
+        URLs to request, by default `routes`
+
+    Returns
+    -------
+    Pandas dataframe
+        Latency summary of each route (see `summarize()`)
+    """
+
+    server = None
+    if base_url is None:
+        server, base_url = serve()
+
+    try:
+        # Warm up each route
+        for route in routes:
+            get(base_url + route)
+
+        # Requests in turn from concurrent threads
+        urls = [routes[i % len(routes)] for i in range(n_requests)]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            timings = list(executor.map(lambda route: get(base_url + route), urls))
+        seconds = time.perf_counter() - start
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    summary = summarize([(route, t, status) for route, (t, status) in zip(urls, timings)], seconds)
+    print(summary.to_string(float_format='{:,.2f}'.format))
+    return summary
+
+
+if __name__ == '__main__':
+    load_test(sys.argv[1] if len(sys.argv) > 1 else None)
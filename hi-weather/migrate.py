@@ -0,0 +1,83 @@
+import os
+import sys
+import sqlite3
+from contextlib import closing
+from urllib.request import pathname2url
+
+
+# Database file, and the indexes the app's date range queries use
+DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'hawaii.sqlite')
+INDEXES = [('measurement', ['date']), ('measurement', ['station', 'date'])]
+
+
+def index_name(table, columns):
+
+    """ Name of the index on the columns of a table (e.g. 'ix_measurement_date') """
+
+    return f'ix_{table}_{"_".join(columns)}'
+
+
+def missing_indexes(db_path=DB_PATH, indexes=INDEXES):
+
+    """
+    Find the indexes missing from the database file, opened read-only.
+
+    Parameters
+    ----------
+    db_path : str, optional
+        Path to SQLite database file, by default `DB_PATH`
+    indexes : list[tuple(str, list[str])], optional
+        Indexes to look for, as pairs of table name and columns, by default
+        `INDEXES`
+
+    Returns
+    -------
+    List[tuple(str, list[str])]
+        Missing indexes
+    """
+
+    uri = f'file:{pathname2url(os.path.abspath(db_path))}?mode=ro'
+    with closing(sqlite3.connect(uri, uri=True)) as conn:
+        existing = {name for name, in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    return [(table, columns) for table, columns in indexes if index_name(table, columns) not in existing]
+
+
+def migrate(db_path=DB_PATH, indexes=INDEXES, wal=False):
+
+    """
+    One-off migration of the database file for serving the app: create the
+    indexes the app's queries use, and optionally switch to write-ahead
+    logging. Both are saved in the database file, which the app itself only
+    opens read-only. Rerunning this does nothing once applied.
+
+    Parameters
+    ----------
+    db_path : str, optional
+        Path to SQLite database file, by default `DB_PATH`
+    indexes : list[tuple(str, list[str])], optional
+        Indexes to create if missing, as pairs of table name and columns, by
+        default `INDEXES`
+    wal : bool, optional
+        Whether to switch the database to write-ahead logging, by default
+        False. This lets readers run while the data is being updated, but
+        requires write access to the file's directory whenever it's opened.
+
+    Returns
+    -------
+    List[str]
+        Names of the indexes created
+    """
+
+    missing = missing_indexes(db_path, indexes)
+    with closing(sqlite3.connect(db_path)) as conn:
+        for table, columns in missing:
+            conn.execute(f'CREATE INDEX {index_name(table, columns)} ON {table} ({", ".join(columns)})')
+        conn.commit()
+        if wal:
+            conn.execute('PRAGMA journal_mode=WAL')
+    return [index_name(table, columns) for table, columns in missing]
+
+
+if __name__ == '__main__':
+    created = migrate(wal='--wal' in sys.argv[1:])
+    print(f'Created indexes: {", ".join(created)}' if created else 'Indexes already exist.')
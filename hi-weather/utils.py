@@ -1,10 +1,61 @@
+import os
+import sqlite3
+import hashlib
+import threading
+import functools
 import datetime as dt
+from contextlib import closing
+from collections import OrderedDict
+from urllib.request import pathname2url
 import numpy as np
 import pandas as pd
-from sqlalchemy import func as F
+from flask import Response, request
+from sqlalchemy import create_engine, event, func as F
+from sqlalchemy.pool import QueuePool
 
 
-def get_date_range(session, table, start_date='start', end_date='end', n_days=None):
+def create_read_engine(db_path, pool_size=8):
+
+    """
+    Create a database engine with a pool of read-only connections to a SQLite 
+    database, which can be shared by request threads. Each connection is 
+    opened in read-only URI mode, may be used by any thread (but only 1 at a 
+    time, as checked out from the pool), and memory-maps the database file. 
+    The file is never written to (see `migrate.py` for creating its indexes).
+
+    Parameters
+    ----------
+    db_path : str
+        Path to SQLite database file
+    pool_size : int, optional
+        Number of pooled connections, by default 8. Requests beyond this wait 
+        for a connection to be returned, so this should match the number of 
+        threads serving requests in each process.
+
+    Returns
+    -------
+    SQLAlchemy engine
+        Database engine
+    """
+
+    # Pool of read-only connections usable from any thread
+    uri = f'sqlite:///file:{pathname2url(os.path.abspath(db_path))}?mode=ro&uri=true'
+    engine = create_engine(uri, poolclass=QueuePool, pool_size=pool_size, max_overflow=0, 
+                           connect_args={'check_same_thread': False})
+
+    # Tune each new connection
+    @event.listens_for(engine, 'connect')
+    def tune(dbapi_conn, connection_record):
+        cursor = dbapi_conn.cursor()
+        cursor.execute('PRAGMA mmap_size=268435456') # read pages straight from a 256 MiB file mapping
+        cursor.execute('PRAGMA cache_size=-8192') # 8 MiB page cache
+        cursor.close()
+
+    return engine
+
+
+def get_date_range(session, table, start_date='start', end_date='end', n_days=None, 
+                   bounds=None):
 
     """
     Get the starting and end dates of a date range as date objects.
@@ -24,6 +75,9 @@ def get_date_range(session, table, start_date='start', end_date='end', n_days=No
     n_days : int, optional
         Number of days to set the date range, by default None. If None, the 
         `start_date` and `end_date` will be used.
+    bounds : tuple(str, str), optional
+        First and last dates in the data in the format "%Y-%m-%d" (e.g. from 
+        `MetadataCache`), by default None. If None, they're queried as needed.
 
     Notes
     _____
@@ -44,13 +98,13 @@ def get_date_range(session, table, start_date='start', end_date='end', n_days=No
 
     # If no `start_date` specified, get first date in data
     if start_date == 'start':
-        start_date = session.query(F.min(table.date)).first()[0] # first date
+        start_date = bounds[0] if bounds else session.query(F.min(table.date)).first()[0] # first date
         days_from_end = n_days # num days from end
     start_date = dt.datetime.strptime(start_date, '%Y-%m-%d').date()
 
     # If no `end_date` specified, get last date in data
     if end_date == 'end':
-        end_date = session.query(F.max(table.date)).first()[0] # last date
+        end_date = bounds[1] if bounds else session.query(F.max(table.date)).first()[0] # last date
         days_from_start = n_days # num days from start
     end_date = dt.datetime.strptime(end_date, '%Y-%m-%d').date()
 
@@ -84,4 +138,481 @@ def count_by_station(session, table):
     by_station = session.query(table.station, F.count(table.station))
     by_station = by_station.group_by(table.station)
     by_station = by_station.order_by(F.count(table.station).desc()).all()
-    return by_station
\ No newline at end of file
+    return by_station
+
+
+class MetadataCache:
+
+    """
+    Cache of the metadata of the measurement data that requests look up: the 
+    first and last dates, the measurement count of each station, and the 
+    most active station. The metadata is queried once and requeried only 
+    when the database changes, as signaled by the file's modification time, 
+    size, or inode, or by `PRAGMA data_version` (which also catches commits 
+    to a WAL database that don't touch the file itself).
+
+    Parameters
+    ----------
+    db_path : str
+        Path to SQLite database file
+    table : SQLAlchemy ORM table class
+        Measurement table to query
+    """
+
+    def __init__(self, db_path, table):
+        self.db_path = db_path
+        self.table = table
+        self._lock = threading.Lock()
+        self._conn = self._conn_key = None
+        self._version = self._metadata = None
+
+    def version(self):
+
+        """
+        Get the version of the database, which changes whenever its data does.
+
+        Returns
+        -------
+        Tuple(int)
+            Modification time (ns), size, and inode of the file, and the data 
+            version of the database. The data version is only comparable 
+            within this process, so this is only for detecting changes (not 
+            e.g. for ETags shared with other processes).
+        """
+
+        stat = os.stat(self.db_path)
+        with self._lock:
+
+            # `data_version` is only comparable on the same connection, so keep 
+            # 1 open per process and file
+            conn_key = (os.getpid(), stat.st_ino)
+            if self._conn_key != conn_key:
+                uri = f'file:{pathname2url(os.path.abspath(self.db_path))}?mode=ro'
+                self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+                self._conn_key = conn_key
+            data_version = self._conn.execute('PRAGMA data_version').fetchone()[0]
+
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino, data_version
+
+    def get(self, session):
+
+        """
+        Get the metadata, querying it if the database changed since it was 
+        last queried.
+
+        Parameters
+        ----------
+        session : SQLAlchemy session object
+            Database session to query with if needed
+
+        Returns
+        -------
+        Dict
+            `date_bounds` - first and last dates in the format "%Y-%m-%d"
+            `stations` - name and measurement count of each station, from 
+            most to least measurements (see `count_by_station()`)
+            `most_active` - name of the station with the most measurements
+            `version` - database version the metadata was queried at
+        """
+
+        version = self.version()
+        with self._lock:
+            if version != self._version:
+                date_bounds = session.query(F.min(self.table.date), F.max(self.table.date)).first()
+                stations = count_by_station(session=session, table=self.table)
+                self._metadata = {'date_bounds': tuple(date_bounds), 'stations': stations, 
+                                  'most_active': stations[0][0], 'version': version}
+                self._version = version
+            return self._metadata
+
+
+class ResponseCache:
+
+    """
+    LRU cache of serialized responses, keyed on the request path and query 
+    string, and valid until the database changes. Each response gets an ETag 
+    hashed from its body, so every process serving the app (and every restart) 
+    gives the same ETag for the same data, and clients that send it back in 
+    `If-None-Match` get an empty 304 response until the data changes.
+
+    Parameters
+    ----------
+    version : callable
+        Function returning the current database version (e.g. 
+        `MetadataCache.version`)
+    maxsize : int, optional
+        Maximum number of responses kept, by default 256. The least recently 
+        used response is dropped when the cache is full.
+    """
+
+    def __init__(self, version, maxsize=256):
+        self.version = version
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._responses = OrderedDict()
+
+    def cached(self, view):
+
+        """
+        Decorate a Flask view to serve its responses from the cache. Only 
+        successful responses are cached.
+
+        Parameters
+        ----------
+        view : callable
+            Flask view function
+
+        Returns
+        -------
+        Callable
+            View function that serves cached responses
+        """
+
+        @functools.wraps(view)
+        def cached_view(*args, **kwargs):
+            version = self.version()
+            key = request.full_path
+
+            # Cached response of this database version
+            with self._lock:
+                cached = self._responses.get(key)
+                if cached is not None and cached[0] == version:
+                    self._responses.move_to_end(key)
+                else:
+                    cached = None
+
+            # Render and cache the response
+            if cached is None:
+                response = view(*args, **kwargs)
+                if response.status_code != 200:
+                    return response
+                body = response.get_data()
+                cached = (version, body, response.mimetype, hashlib.sha1(body).hexdigest()[:20])
+                with self._lock:
+                    self._responses[key] = cached
+                    self._responses.move_to_end(key)
+                    while len(self._responses) > self.maxsize:
+                        self._responses.popitem(last=False)
+
+            # Serve the body, or a 304 if the client has it
+            _, body, mimetype, etag = cached
+            response = Response(body, mimetype=mimetype)
+            response.set_etag(etag)
+            response.cache_control.no_cache = True # revalidate before reusing
+            return response.make_conditional(request)
+
+        return cached_view
+
+
+class TempRollup:
+
+    """
+    Daily rollups of the temperature observations (`tobs`) for answering the 
+    minimum, average, and maximum temperature over any date range in constant 
+    time. The observations are reduced to a count, sum, minimum, and maximum 
+    per day, then to prefix sums of the counts and sums (for the average) and 
+    to a sparse table of the daily minimums and maximums over runs of 2^k 
+    days (for the extremes, from 2 overlapping runs covering the range). The 
+    rollups are rebuilt when the database changes.
+
+    The average is only taken from the prefix sums when every observation is 
+    a whole number, since their sums are then exact and match SQL's `avg()` 
+    regardless of order. Otherwise ranges are aggregated with SQL.
+
+    Parameters
+    ----------
+    table : SQLAlchemy ORM table class
+        Measurement table to query
+    version : callable
+        Function returning the current database version (e.g. 
+        `MetadataCache.version`)
+    """
+
+    def __init__(self, table, version):
+        self.table = table
+        self.version = version
+        self._lock = threading.Lock()
+        self._version = self._rollup = None
+
+    def build(self, session):
+
+        """
+        Query the observations and roll them up by day.
+
+        Parameters
+        ----------
+        session : SQLAlchemy session object
+            Database session
+
+        Returns
+        -------
+        Dict
+            Days ("%Y-%m-%d", sorted), prefix sums of the daily counts and 
+            sums, sparse tables of the daily minimums and maximums, and 
+            whether the sums are exact
+        """
+
+        rows = session.query(self.table.date, self.table.tobs).filter(self.table.tobs.isnot(None))
+        rows = rows.order_by(self.table.date).all()
+        dates = np.array([date for date, _ in rows], dtype=str)
+        tobs = np.array([temp for _, temp in rows], dtype=float)
+
+        # Count, sum, minimum, and maximum of each day
+        days, starts, counts = np.unique(dates, return_index=True, return_counts=True)
+        if not len(days):
+            return {'days': days, 'exact': True}
+        sums = np.add.reduceat(tobs, starts)
+        mins, maxs = np.minimum.reduceat(tobs, starts), np.maximum.reduceat(tobs, starts)
+
+        # Sparse tables: level k holds the extremes of the 2^k days from each day
+        min_table, max_table = [mins], [maxs]
+        while 2 ** len(min_table) <= len(days):
+            half = 2 ** (len(min_table) - 1)
+            min_table.append(np.minimum(min_table[-1][:-half], min_table[-1][half:]))
+            max_table.append(np.maximum(max_table[-1][:-half], max_table[-1][half:]))
+
+        return {'days': days, 
+                'count_prefix': np.concatenate([[0], np.cumsum(counts)]), 
+                'sum_prefix': np.concatenate([[0], np.cumsum(sums)]), 
+                'min_table': min_table, 'max_table': max_table, 
+                'exact': bool(np.all(tobs == np.round(tobs)))}
+
+    def stats(self, session, start_date, end_date):
+
+        """
+        Get the minimum, average, and maximum temperature from the start date 
+        to the end date (inclusive), as `SELECT min(tobs), avg(tobs), 
+        max(tobs)` over the range would.
+
+        Parameters
+        ----------
+        session : SQLAlchemy session object
+            Database session to build the rollups with if needed
+        start_date : datetime.date
+            Start date of the range
+        end_date : datetime.date
+            End date of the range
+
+        Returns
+        -------
+        Tuple(float)
+            Minimum, average, and maximum temperature, or None for each if 
+            there are no observations in the range
+        """
+
+        # Rollups of this database version
+        version = self.version()
+        with self._lock:
+            if version != self._version:
+                self._rollup = self.build(session)
+                self._version = version
+            rollup = self._rollup
+
+        # Aggregate with SQL if the rollups can't match it exactly
+        if not rollup['exact']:
+            SELECT = [F.min(self.table.tobs), F.avg(self.table.tobs), F.max(self.table.tobs)]
+            dates = (self.table.date >= start_date) & (self.table.date <= end_date)
+            return tuple(session.query(*SELECT).filter(dates).first())
+
+        # Days in the range
+        lo = np.searchsorted(rollup['days'], str(start_date), side='left')
+        hi = np.searchsorted(rollup['days'], str(end_date), side='right')
+        if hi <= lo:
+            return None, None, None
+
+        # Count and sum from the prefix sums, extremes from the sparse tables
+        count = rollup['count_prefix'][hi] - rollup['count_prefix'][lo]
+        total = rollup['sum_prefix'][hi] - rollup['sum_prefix'][lo]
+        k = int(hi - lo).bit_length() - 1 # largest run of 2^k days within the range
+        min_k, max_k = rollup['min_table'][k], rollup['max_table'][k]
+        return (float(min(min_k[lo], min_k[hi - 2 ** k])), float(total / count), 
+                float(max(max_k[lo], max_k[hi - 2 ** k])))
+
+
+class ColumnarStore:
+
+    """
+    In-memory columnar copy of the measurement data, for serving the routes 
+    without the ORM. The table is loaded into NumPy arrays (dates as int32 day 
+    numbers, station codes, `prcp`, and `tobs`) sorted by date, and also 
+    grouped by station, so date ranges are sliced with binary searches and 
+    aggregated with vectorized functions. The arrays are reloaded when the 
+    database changes.
+
+    Results match the SQL queries of the routes: rows come in the same order 
+    (by date, then id), missing values are None, and the average temperature 
+    is exact when the observations are whole numbers.
+
+    Parameters
+    ----------
+    db_path : str
+        Path to SQLite database file
+    version : callable
+        Function returning the current database version (e.g. 
+        `MetadataCache.version`)
+    """
+
+    def __init__(self, db_path, version):
+        self.db_path = db_path
+        self.version = version
+        self._lock = threading.Lock()
+        self._version = self._data = None
+
+    def load(self):
+
+        """
+        Load the measurement table into arrays.
+
+        Returns
+        -------
+        Dict
+            Arrays sorted by date (`days`, `dates`, `codes`, `prcp`, `tobs`), 
+            the same arrays grouped by station (`station_days`, 
+            `station_dates`, `station_tobs`) with the bounds of each station's 
+            rows (`station_offsets`), the station names (`names`), and the 
+            metadata of the data (`metadata`, see `MetadataCache.get()`)
+        """
+
+        uri = f'file:{pathname2url(os.path.abspath(self.db_path))}?mode=ro'
+        with closing(sqlite3.connect(uri, uri=True)) as conn:
+            rows = conn.execute('SELECT id, station, date, prcp, tobs FROM measurement').fetchall()
+        ids, stations, dates, prcp, tobs = (list(col) for col in zip(*rows)) if rows else ([],) * 5
+
+        # Columns, with dates as days since 1970-01-01 and stations as codes
+        ids = np.array(ids, dtype=np.int64)
+        days = np.array(dates, dtype='datetime64[D]').astype(np.int32)
+        names, codes = np.unique(np.array(stations, dtype=str), return_inverse=True)
+        prcp, tobs = np.array(prcp, dtype=float), np.array(tobs, dtype=float) # NULL as NaN
+
+        # Sort by date then id, and by station then date then id
+        order, station_order = np.lexsort((ids, days)), np.lexsort((ids, days, codes))
+        dates = np.datetime_as_string(days.astype('datetime64[D]'))
+        data = {'days': days[order], 'dates': dates[order], 'codes': codes[order], 
+                'prcp': prcp[order], 'tobs': tobs[order], 'names': names, 
+                'station_days': days[station_order], 'station_dates': dates[station_order], 
+                'station_tobs': tobs[station_order], 
+                'station_offsets': np.searchsorted(codes[station_order], np.arange(len(names) + 1))}
+
+        # Date bounds and measurement counts by station, from most to least
+        counts = np.bincount(data['codes'], minlength=len(names))
+        stations = [(str(names[i]), int(counts[i])) for i in np.argsort(-counts, kind='stable')]
+        data['metadata'] = {'date_bounds': (str(data['dates'][0]), str(data['dates'][-1])) if rows else (None, None), 
+                            'stations': stations, 'most_active': stations[0][0] if stations else None}
+        return data
+
+    def data(self):
+
+        """ Arrays of the current database version, reloaded if the database changed """
+
+        version = self.version()
+        with self._lock:
+            if version != self._version:
+                self._data = self.load()
+                self._version = version
+            return self._data
+
+    @staticmethod
+    def day(date):
+
+        """ Day number of a date (days since 1970-01-01) """
+
+        return (date - dt.date(1970, 1, 1)).days
+
+    @staticmethod
+    def values(arr):
+
+        """ Array values as a list with NaN as None (as SQL returns NULL) """
+
+        return [None if value != value else value for value in arr.tolist()]
+
+    def metadata(self):
+
+        """
+        Get the date bounds, the measurement count of each station, and the 
+        most active station.
+
+        Returns
+        -------
+        Dict
+            `date_bounds`, `stations`, and `most_active` (see 
+            `MetadataCache.get()`)
+        """
+
+        return self.data()['metadata']
+
+    def precipitation(self, start_date):
+
+        """
+        Get the precipitation measurements from the start date on.
+
+        Parameters
+        ----------
+        start_date : datetime.date
+            First date
+
+        Returns
+        -------
+        List[tuple(str, float)]
+            Date and precipitation of each measurement
+        """
+
+        data = self.data()
+        lo = np.searchsorted(data['days'], self.day(start_date), side='left')
+        return list(zip(data['dates'][lo:].tolist(), self.values(data['prcp'][lo:])))
+
+    def temps(self, station, start_date):
+
+        """
+        Get the temperature observations of a station from the start date on.
+
+        Parameters
+        ----------
+        station : str
+            Station name
+        start_date : datetime.date
+            First date
+
+        Returns
+        -------
+        List[tuple(str, float)]
+            Date and temperature of each observation
+        """
+
+        data = self.data()
+        code = np.searchsorted(data['names'], station)
+        if code == len(data['names']) or data['names'][code] != station:
+            return []
+
+        # Slice the station's rows from the start date on
+        first, last = data['station_offsets'][code], data['station_offsets'][code + 1]
+        lo = first + np.searchsorted(data['station_days'][first:last], self.day(start_date), side='left')
+        return list(zip(data['station_dates'][lo:last].tolist(), self.values(data['station_tobs'][lo:last])))
+
+    def temp_stats(self, start_date, end_date):
+
+        """
+        Get the minimum, average, and maximum temperature from the start date 
+        to the end date (inclusive).
+
+        Parameters
+        ----------
+        start_date : datetime.date
+            Start date of the range
+        end_date : datetime.date
+            End date of the range
+
+        Returns
+        -------
+        Tuple(float)
+            Minimum, average, and maximum temperature, or None for each if 
+            there are no observations in the range
+        """
+
+        data = self.data()
+        lo = np.searchsorted(data['days'], self.day(start_date), side='left')
+        hi = np.searchsorted(data['days'], self.day(end_date), side='right')
+        tobs = data['tobs'][lo:hi]
+        tobs = tobs[~np.isnan(tobs)]
+        if not len(tobs):
+            return None, None, None
+        return float(tobs.min()), float(tobs.sum() / len(tobs)), float(tobs.max())
@@ -1,48 +1,67 @@
+import os
 import json
 import datetime as dt
 import numpy as np
 import pandas as pd
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
 
-from utils import udf_wiki, udf_kaggle, udf_movies, udf_ratings
+from utils import udf_wiki, udf_kaggle, udf_movies, udf_ratings, checkpoints, bulk_load, formats, schemas
+from utils import profiling
 from config import sys_vars
+from config.data_vars import ratings_dtypes, movies_dtypes, count_dtype
 
 
-def extract(file_path, file_type='csv'):
+def extract(file_path, file_type='csv', dtypes=None, stream=False):
 
     """
-    Read data from a csv or json file.
+    Read data from a csv, json, parquet, feather, or pickle file.
 
     Parameters
     ----------
     file_path : str
         path to data file
     file_type : str, optional
-        'csv' or 'json', by default 'csv'
+        'csv', 'json', 'parquet', 'feather', or 'pickle', by default 'csv'
+    dtypes : dict, optional
+        Schema of compact column types for dataframes (e.g. `ratings_dtypes` 
+        from the `config.data_vars` module), by default None
+    stream : bool, optional
+        Whether to read a json file lazily, one record at a time, by default 
+        False. The file may then hold a JSON array or newline-delimited JSON 
+        (see `formats.iter_json()`).
 
     Returns
     -------
     Pandas dataframe 
-        If reading data from a CSV file
+        If reading data from a CSV, Parquet, Feather, or pickle file
     List[dict]
         If reading data from a json file
+    Iterator[dict]
+        If streaming data from a json file
 
     Raises
     ------
     ValueError
-        The `file_type` parameter only accepts 'csv' or 'json'
+        The `file_type` parameter only accepts 'csv', 'json', 'parquet', 
+        'feather', or 'pickle'
     """
 
-    # If reading data from csv
-    if file_type == 'csv':
-        data = pd.read_csv(file_path, low_memory=False)
+    # If streaming data from json
+    if file_type == 'json' and stream:
+        data = formats.iter_json(file_path)
 
     # If reading data from json
     elif file_type == 'json':
         with open(file_path, 'r') as f:
             data = json.load(f)
+
+    # If reading data from csv, parquet, feather, or pickle
+    elif file_type in ('csv', 'parquet', 'feather', 'pickle'):
+        data = formats.read_frame(file_path, file_type, dtypes)
         
-    # Any input other than 'csv' or 'json'
+    # Any other input
     else:
         raise ValueError('Invalid file type.')
 
@@ -51,7 +70,9 @@ def extract(file_path, file_type='csv'):
 
 def transform(wiki_movies, kaggle_movies, 
               ratings_path=sys_vars.ratings_path, 
-              reduced_ratings_path=sys_vars.reduced_ratings_path):
+              reduced_ratings_path=sys_vars.reduced_ratings_path, 
+              chunksize=None, n_workers=None, compact_dtypes=False, 
+              report_memory=False, rating_stats=False):
 
     """
     Clean the movie and rating data, then join them all. Additionally, reduce 
@@ -60,8 +81,8 @@ def transform(wiki_movies, kaggle_movies,
 
     Parameters
     ----------
-    wiki_movies : list[dict]
-        Wikipedia movie data in JSON format
+    wiki_movies : list[dict] or iterator[dict]
+        Wikipedia movie data in JSON format (see `udf_wiki.clean_wiki_movies()`)
     kaggle_movies : Pandas dataframe
         Kaggle movie data
     ratings_path : str
@@ -70,32 +91,87 @@ def transform(wiki_movies, kaggle_movies,
     reduced_ratings_path : str
         Name of the CSV file to save the reduced rating data to, by default 
         `reduced_ratings_path` from the `config.sys_vars` module
+    chunksize : int, optional
+        Number of rows to read per chunk when streaming the rating data, by 
+        default None. If None, the rating data is read into memory all at once.
+    n_workers : int, optional
+        Number of worker processes used to clean the Wikipedia data, by 
+        default None. If None, the data is cleaned in a single process.
+    compact_dtypes : bool, optional
+        Whether to use the compact column types of `ratings_dtypes`, 
+        `movies_dtypes`, and `count_dtype` from the `config.data_vars` module 
+        for the rating data, movie data, and rating counts, by default False
+    report_memory : bool, optional
+        Whether to print the memory used by the data at each stage, by 
+        default False
+    rating_stats : bool, optional
+        Whether to also add the mean, variance, first and last time, and 
+        monthly rate of each movie's ratings, computed in the same pass as 
+        the rating counts (see `udf_ratings.join_stats()`), by default False
 
     Returns
     -------
     Pandas dataframe
         Complete data containing movies and aggregate ratings
+    Int
+        Number of rows in the reduced rating data
     """
 
+    # Compact column types
+    r_dtypes = ratings_dtypes if compact_dtypes else None
+    m_dtypes = movies_dtypes if compact_dtypes else None
+    c_dtype = count_dtype if compact_dtypes else None
+
     # Clean movie data
-    wiki_df = udf_wiki.clean_wiki_movies(wiki_movies) # clean Wikipedia data
+    wiki_df = udf_wiki.clean_wiki_movies(wiki_movies, n_workers) # clean Wikipedia data
     kaggle_df = udf_kaggle.clean_kaggle_movies(kaggle_movies) # clean kaggle data
     movies_df = udf_movies.join_movie_data(wiki_df, kaggle_df) # join movie data
+    if m_dtypes:
+        movies_df = schemas.apply_schema(movies_df, m_dtypes)
+    memory = {'wiki': schemas.memory_usage(wiki_df), 'kaggle': schemas.memory_usage(kaggle_df), 
+              'movies': schemas.memory_usage(movies_df)} if report_memory else {}
+
+    # Stream rating data in chunks, reducing and counting it along the way
+    if chunksize:
+        reduced = udf_ratings.reduce_ratings_chunked(ratings_path, 
+                                                     movies_df['movie_id'].values, 
+                                                     reduced_ratings_path, 
+                                                     chunksize=chunksize, 
+                                                     dtypes=r_dtypes, 
+                                                     return_stats=rating_stats)
+        counts, n_ratings = reduced[:2]
+        with profiling.stage('join_data', rows_in=n_ratings) as rows:
+            df = udf_ratings.join_counts(movies_df, counts, c_dtype)
+            if rating_stats:
+                df = udf_ratings.join_stats(df, reduced[2])
+            rows['rows_out'] = df.shape[0]
 
     # Extract and reduce rating data
-    ratings_df = extract(ratings_path)
-    ratings_df = udf_ratings.reduce_ratings(ratings_df, 
-                                            movies_df['movie_id'].values, 
-                                            reduced_ratings_path)
-    n_ratings = ratings_df.shape[0] # number of rows
-
-    # Add aggregate rating counts to the movie data
-    df = udf_ratings.join_data(movies_df, ratings_df)
+    else:
+        ratings_df = extract(ratings_path, dtypes=r_dtypes)
+        if report_memory:
+            memory['ratings'] = schemas.memory_usage(ratings_df)
+        ratings_df = udf_ratings.reduce_ratings(ratings_df, 
+                                                movies_df['movie_id'].values, 
+                                                reduced_ratings_path)
+        n_ratings = ratings_df.shape[0] # number of rows
+        if report_memory:
+            memory['reduced'] = schemas.memory_usage(ratings_df)
+
+        # Add aggregate rating counts to the movie data
+        df = udf_ratings.join_data(movies_df, ratings_df, c_dtype, rating_stats)
+
+    if report_memory:
+        memory['joined'] = schemas.memory_usage(df)
+        schemas.print_memory_report(memory)
 
     return df, n_ratings
 
 
-def load(data, table='movies', n_ratings=0, n_chunks=10, uri_properties=sys_vars.psql):
+@profiling.staged('load_{table}', rows_out=lambda summary: summary['rows'])
+def load(data, table='movies', n_ratings=0, n_chunks=10, uri_properties=sys_vars.psql, 
+         method='to_sql', staging=False, uri=None, n_workers=1, 
+         target_seconds=None, memory_budget=None):
 
     """
     Load data into a PostgreSQL database. This function requires some setup 
@@ -113,48 +189,136 @@ def load(data, table='movies', n_ratings=0, n_chunks=10, uri_properties=sys_vars
     Parameters
     ----------
     data : Pandas dataframe or str
-        Movie data or path to CSV file containing rating data
+        Movie data or path to CSV, Parquet, Feather, or pickle file containing 
+        rating data (format inferred from the file extension)
     table : str, optional
         Name of table in database to load into, by default 'movies'
     n_ratings : int, optional
         Number of rows in the rating data, by default 0
     n_chunks : int, optional
         Number of chunks to read and load if loading the rating data, 
-        by default 10
+        by default 10. Not used if chunks are sized adaptively.
     uri_properties : dict, optional
         Connection string properties consisting of the database user, 
         password, location, port, and name; by default `psql` from the 
         `config.sys_vars` module
+    method : str, optional
+        'to_sql' or 'copy', by default 'to_sql'. With 'copy', rating data 
+        chunks are bulk loaded with `COPY ... FROM STDIN` (see the 
+        `utils.bulk_load` module) instead of `to_sql()` inserts.
+    staging : bool, optional
+        Whether to load the rating data into a staging table (unlogged on 
+        PostgreSQL) and swap it in for `table` once fully loaded, by default 
+        False
+    uri : str, optional
+        Database URL to connect to instead of the one built from 
+        `uri_properties` (e.g. 'sqlite:///movies.db'), by default None
+    n_workers : int, optional
+        Number of threads loading rating data chunks concurrently, each on its 
+        own pooled connection, by default 1. If more than 1, chunks are parsed 
+        and loaded at the same time (see `bulk_load.concurrent_load()`).
+    target_seconds : float, optional
+        Target time to load a rating data chunk, by default None
+    memory_budget : int, optional
+        Target size in bytes of a rating data chunk in memory, by default 
+        None. If this or `target_seconds` is given, chunks are sized 
+        adaptively from the throughput and memory use measured so far (see 
+        `bulk_load.AdaptiveChunker`) instead of split into `n_chunks`.
+
+    Returns
+    -------
+    Dict
+        Run summary with the rows loaded, seconds taken, rows per second, the 
+        chunking parameters used, and the stats of each chunk if loading the 
+        rating data
+
+    Raises
+    ------
+    ValueError
+        The `method` parameter only accepts 'to_sql' or 'copy'
     """
+
+    if method not in ('to_sql', 'copy'):
+        raise ValueError('Invalid load method.')
     
     # Connection string
-    user = uri_properties['user']
-    password = uri_properties['password']
-    location = uri_properties['location']
-    port = uri_properties['port']
-    database = uri_properties['database']
-    uri = f'postgresql://{user}:{password}@{location}:{port}/{database}'
-
-    # Create database engine
-    engine = create_engine(uri)
+    if uri is None:
+        user = uri_properties['user']
+        password = uri_properties['password']
+        location = uri_properties['location']
+        port = uri_properties['port']
+        database = uri_properties['database']
+        uri = f'postgresql://{user}:{password}@{location}:{port}/{database}'
+
+    # Create database engine (with a connection per worker, plus 1 for creating 
+    # tables, if loading concurrently)
+    if n_workers > 1:
+        connect_args = {'check_same_thread': False} if make_url(uri).get_backend_name() == 'sqlite' else {}
+        engine = create_engine(uri, poolclass=QueuePool, pool_size=n_workers + 1, max_overflow=0, 
+                               connect_args=connect_args)
+    else:
+        engine = create_engine(uri)
 
     # Load data into database
+    stats, start = [], dt.datetime.now() # start tracking progress
     if n_ratings: # load rating data in chunks
-        loaded, start = 0, dt.datetime.now() # start tracking progress
-        chunksize = round(n_ratings, -len(str(n_ratings)) + 1) // n_chunks # chunk size
-        for chunk in pd.read_csv(data, chunksize=chunksize): # read in chunks
-            unloaded = min(loaded + chunksize, n_ratings) # upper limit of loading range
-            print(f'Loading rows {loaded:7} to {unloaded:7}', end=' | ') # print progress
-            chunk.to_sql(table, engine, if_exists='append') # load chunk
-            loaded += chunksize # update lower limit of loading range
-            print((dt.datetime.now() - start), 'elapsed') # print elapsed time
+        target = f'{table}_staging' if staging else table # table to load chunks into
+
+        # Read in adaptively sized chunks or in `n_chunks` equal chunks
+        if target_seconds or memory_budget:
+            chunker = bulk_load.AdaptiveChunker(target_seconds, memory_budget)
+            chunks = formats.iter_chunks(data, lambda: chunker.size)
+        else:
+            chunker, chunksize = None, -(-n_ratings // n_chunks) # ceiling division
+            chunks = formats.iter_chunks(data, chunksize)
+
+        if n_workers > 1: # parse and load chunks concurrently
+            stats = bulk_load.concurrent_load(chunks, target, engine, method=method, 
+                                              n_workers=n_workers, unlogged=staging, 
+                                              chunker=chunker)
+        else:
+            loaded = 0
+            for i, chunk in enumerate(chunks):
+                unloaded = loaded + chunk.shape[0] # upper limit of loading range
+                print(f'Loading rows {loaded:7} to {unloaded:7}', end=' | ') # print progress
+                with profiling.stage(f'chunk_{i}', rows_in=chunk.shape[0]) as rows:
+                    chunk_start = dt.datetime.now()
+                    if method == 'copy': # bulk load chunk
+                        if not loaded:
+                            bulk_load.create_table(chunk, target, engine, unlogged=staging)
+                        bulk_load.copy_chunk(chunk, target, engine)
+                    else: # insert chunk
+                        if_exists = 'append' if loaded else 'replace' # replace table on first chunk
+                        chunk.to_sql(target, engine, if_exists=if_exists)
+                    seconds = (dt.datetime.now() - chunk_start).total_seconds()
+                    rows['rows_out'] = chunk.shape[0]
+                if chunker is not None:
+                    chunker.observe(chunk, seconds) # size the next chunk
+                stats.append({'start_row': loaded, 'rows': chunk.shape[0], 'seconds': seconds, 
+                              'rows_per_sec': chunk.shape[0] / seconds if seconds else float('inf')})
+                loaded = unloaded # update lower limit of loading range
+                print(f'{stats[-1]["rows_per_sec"]:,.0f} rows/sec', end=' | ') # print throughput
+                print((dt.datetime.now() - start), 'elapsed') # print elapsed time
+        if staging: # replace table with fully loaded staging table
+            bulk_load.swap_tables(target, table, engine)
+        chunking = chunker.summary() if chunker else {'chunksize': chunksize}
     else: # load movie data
         data.to_sql(table, engine, if_exists='replace')
+        stats.append({'start_row': 0, 'rows': data.shape[0]})
+        chunking = {}
+
+    # Summarize the run
+    seconds = (dt.datetime.now() - start).total_seconds()
+    rows = sum(chunk_stats['rows'] for chunk_stats in stats)
+    return {'table': table, 'method': method, 'n_workers': n_workers, 'rows': rows, 
+            'seconds': seconds, 'rows_per_sec': rows / seconds if seconds else float('inf'), 
+            'chunking': chunking, 'chunks': stats}
 
 
 def etl_pipeline(wiki_path=sys_vars.wiki_path, 
                  kaggle_path=sys_vars.kaggle_path, 
-                 ratings_path=sys_vars.reduced_ratings_path):
+                 ratings_path=sys_vars.reduced_ratings_path, 
+                 checkpoint_dir=None, report_path=None, profile_dir=None):
 
     """
     Extract-transform-load pipeline:
@@ -178,6 +342,109 @@ def etl_pipeline(wiki_path=sys_vars.wiki_path,
     ratings_path : str, optional
         Path to the reduced Kaggle ratings data, by default 
         `reduced_ratings_path` from the `config.sys_vars` module
+    checkpoint_dir : str, optional
+        Directory to save the output of each stage to, by default None. If 
+        given, the pipeline is run with `incremental_etl_pipeline()` and only 
+        the stages whose inputs changed since the last run are rerun.
+    report_path : str, optional
+        Path to save a JSON run report to, by default None. If given, the 
+        wall time, CPU time, peak RSS, rows in and out, and rows per second of 
+        each stage and sub-step are recorded (see the `utils.profiling` 
+        module).
+    profile_dir : str, optional
+        Directory to save a cProfile dump of each stage to, by default None. 
+        Only used with `report_path`.
+
+    Returns
+    -------
+    Pandas dataframe
+        Joined movie data with aggregate rating data
+    """
+
+    with profiling.run(report_path, profile_dir):
+
+        # Run only the stages whose inputs changed
+        if checkpoint_dir:
+            return incremental_etl_pipeline(wiki_path, kaggle_path, 
+                                            reduced_ratings_path=ratings_path, 
+                                            checkpoint_dir=checkpoint_dir)
+
+        # Extract movie data (the Wikipedia data is read as it's transformed)
+        print('Extracting data...')
+        with profiling.stage('extract') as rows:
+            wiki_data = extract(wiki_path, 'json', stream=True) # Wikipedia data
+            kaggle_df = extract(kaggle_path) # Kaggle data
+            rows['rows_out'] = kaggle_df.shape[0]
+        print('Completed extracting.')
+
+        # Transform data
+        print('Transforming data...')
+        with profiling.stage('transform') as rows:
+            df, n_ratings = transform(wiki_data, kaggle_df)
+            rows['rows_out'] = df.shape[0]
+        print(df.info())
+        print('Completed transforming.')
+
+        # Load data into database
+        print('Loading data into database...')
+        with profiling.stage('load'):
+            load(df) # load movie data
+            load(ratings_path, table='ratings', n_ratings=n_ratings) # load rating data
+        print('Completed loading.')
+
+    return df
+
+
+def incremental_etl_pipeline(wiki_path=sys_vars.wiki_path, 
+                             kaggle_path=sys_vars.kaggle_path, 
+                             raw_ratings_path=sys_vars.ratings_path, 
+                             reduced_ratings_path=sys_vars.reduced_ratings_path, 
+                             checkpoint_dir='checkpoints', chunksize=None, 
+                             n_workers=None, rating_stats=False, 
+                             uri_properties=sys_vars.psql):
+
+    """
+    Extract-transform-load pipeline that saves the output of each stage and 
+    skips the stages whose inputs are unchanged since the last run. Each 
+    stage is keyed on the hashes of its input files and of the pipeline 
+    source (see `checkpoints.source_paths`):
+    1. `wiki`           -   clean Wikipedia movie data
+    2. `kaggle`         -   clean Kaggle movie data
+    3. `movies`         -   joined movie data (keyed on stages 1 and 2)
+    4. `ratings`        -   rating counts (and statistics) by movie and the 
+                            reduced rating data (keyed on the raw rating data 
+                            and stage 3)
+    5. `load_movies`    -   movie data loaded into the database (stages 3, 4)
+    6. `load_ratings`   -   reduced rating data loaded into the database (stage 4)
+
+    Parameters
+    ----------
+    wiki_path : str, optional
+        Path to the raw Wikipedia movie data, by default `wiki_path` from the 
+        `config.sys_vars` module
+    kaggle_path : str, optional
+        Path to the raw Kaggle movie data, by default `kaggle_path` from the 
+        `config.sys_vars` module
+    raw_ratings_path : str, optional
+        Path to the raw Kaggle rating data, by default `ratings_path` from the 
+        `config.sys_vars` module
+    reduced_ratings_path : str, optional
+        Path to save the reduced rating data to, by default 
+        `reduced_ratings_path` from the `config.sys_vars` module
+    checkpoint_dir : str, optional
+        Directory to save the output of each stage to, by default 'checkpoints'
+    chunksize : int, optional
+        Number of rows to read per chunk when streaming the rating data, by 
+        default None (see `transform()`)
+    n_workers : int, optional
+        Number of worker processes used to clean the Wikipedia data, by 
+        default None (see `transform()`)
+    rating_stats : bool, optional
+        Whether to also add rating statistics to the movie data, by default 
+        False (see `transform()`)
+    uri_properties : dict, optional
+        Connection string properties (see `load()`), by default `psql` from 
+        the `config.sys_vars` module
 
     Returns
     -------
@@ -185,26 +452,75 @@ def etl_pipeline(wiki_path=sys_vars.wiki_path,
         Joined movie data with aggregate rating data
     """
 
-    # Extract movie data
-    print('Extracting data...')
-    wiki_data = extract(wiki_path, 'json') # Wikipedia data
-    kaggle_df = extract(kaggle_path) # Kaggle data
-    print('Completed extracting.')
+    # Stage keys
+    source = checkpoints.source_hash()
+    wiki_key = checkpoints.stage_key('wiki', checkpoints.file_hash(wiki_path), source)
+    kaggle_key = checkpoints.stage_key('kaggle', checkpoints.file_hash(kaggle_path), source)
+    movies_key = checkpoints.stage_key('movies', wiki_key, kaggle_key)
+    ratings_key = checkpoints.stage_key('ratings', checkpoints.file_hash(raw_ratings_path), 
+                                        movies_key, reduced_ratings_path, rating_stats)
+
+    # Helper functions to run each stage
+    def clean_wiki():
+        return udf_wiki.clean_wiki_movies(extract(wiki_path, 'json', stream=True), n_workers)
+
+    def clean_kaggle():
+        return udf_kaggle.clean_kaggle_movies(extract(kaggle_path))
+
+    def join_movies(): # upstream stages are only read if this stage reruns
+        wiki_df, _ = checkpoints.cached(checkpoint_dir, 'wiki', wiki_key, clean_wiki)
+        kaggle_df, _ = checkpoints.cached(checkpoint_dir, 'kaggle', kaggle_key, clean_kaggle)
+        return udf_movies.join_movie_data(wiki_df, kaggle_df)
+
+    def reduce_ratings(movie_id):
+        if chunksize:
+            reduced = udf_ratings.reduce_ratings_chunked(raw_ratings_path, movie_id, 
+                                                         reduced_ratings_path, chunksize, 
+                                                         return_stats=rating_stats)
+            return reduced if rating_stats else reduced + (None,)
+        ratings_df = udf_ratings.reduce_ratings(extract(raw_ratings_path), movie_id, 
+                                                reduced_ratings_path)
+        stats = udf_ratings.rating_stats(ratings_df['movieId'], ratings_df['rating'], 
+                                         ratings_df['timestamp']) if rating_stats else None
+        return udf_ratings.count_ratings(ratings_df), ratings_df.shape[0], stats
 
     # Transform data
     print('Transforming data...')
-    df, n_ratings = transform(wiki_data, kaggle_df)
-    print(df.info())
+    with profiling.stage('transform') as rows:
+        movies_df, ran = checkpoints.cached(checkpoint_dir, 'movies', movies_key, join_movies)
+        print('Cleaned and joined movie data.' if ran else 'Movie data unchanged, skipped.')
+
+        # Rerun the ratings stage if the reduced rating data was removed
+        if not os.path.exists(reduced_ratings_path):
+            checkpoints.mark_done(checkpoint_dir, 'ratings', None)
+        (counts, n_ratings, stats), ran = checkpoints.cached(checkpoint_dir, 'ratings', ratings_key, 
+                                                             reduce_ratings, movies_df['movie_id'].values)
+        print('Reduced and counted rating data.' if ran else 'Rating data unchanged, skipped.')
+        df = udf_ratings.join_counts(movies_df, counts)
+        if rating_stats:
+            df = udf_ratings.join_stats(df, stats)
+        rows['rows_out'] = df.shape[0]
     print('Completed transforming.')
 
     # Load data into database
     print('Loading data into database...')
-    load(df) # load movie data
-    load(ratings_path, table='ratings', n_ratings=n_ratings) # load rating data
+    with profiling.stage('load'):
+        load_movies_key = checkpoints.stage_key('load_movies', movies_key, ratings_key)
+        if not checkpoints.is_done(checkpoint_dir, 'load_movies', load_movies_key):
+            load(df, uri_properties=uri_properties) # load movie data
+            checkpoints.mark_done(checkpoint_dir, 'load_movies', load_movies_key)
+        else:
+            print('Movie table unchanged, skipped.')
+        if not checkpoints.is_done(checkpoint_dir, 'load_ratings', ratings_key):
+            load(reduced_ratings_path, table='ratings', n_ratings=n_ratings, 
+                 uri_properties=uri_properties) # load rating data
+            checkpoints.mark_done(checkpoint_dir, 'load_ratings', ratings_key)
+        else:
+            print('Rating table unchanged, skipped.')
     print('Completed loading.')
 
     return df
 
 
 if __name__ == '__main__':
-    etl_pipeline()
\ No newline at end of file
+    etl_pipeline()
@@ -0,0 +1,124 @@
+import os
+import tempfile
+import pandas as pd
+
+import ETL
+from utils import profiling
+from benchmarks import generators
+
+
+def sqlite_safe(df):
+
+    """ Write list values (e.g. `stars`) as text, since SQLite has no array type """
+
+    df = df.copy()
+    for col in df.columns[df.dtypes == object]:
+        is_list = df[col].map(lambda value: isinstance(value, list))
+        if is_list.any():
+            df.loc[is_list, col] = df.loc[is_list, col].map(str)
+    return df
+
+
+def run_pipeline(paths, data_dir, chunksize=None, n_workers=None, load_workers=1, method='to_sql'):
+
+    """
+    Run the extract, transform, and load stages on a synthetic dataset,
+    loading into a fresh SQLite database in `data_dir`, and record the
+    metrics of each stage (see the `utils.profiling` module).
+
+    Parameters
+    ----------
+    paths : dict
+        Paths to the data files from `generators.write_dataset()`
+    data_dir : str
+        Directory to write the reduced rating data, database, and run report to
+    chunksize : int, optional
+        Number of rows per chunk when streaming the rating data, by default None
+    n_workers : int, optional
+        Number of worker processes cleaning the Wikipedia data, by default None
+    load_workers : int, optional
+        Number of threads loading the rating data, by default 1
+    method : str, optional
+        'to_sql' or 'copy' (see `ETL.load()`), by default 'to_sql'
+
+    Returns
+    -------
+    Dict
+        Run report (see `profiling.RunReport.to_dict()`)
+    """
+
+    reduced_path = os.path.join(data_dir, 'ratings_reduced.csv')
+    db_path = os.path.join(data_dir, 'movies.db')
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    uri = f'sqlite:///{db_path}'
+
+    with profiling.run(os.path.join(data_dir, 'run.json')) as report:
+        with profiling.stage('extract') as rows:
+            wiki_data = ETL.extract(paths['wiki'], 'json', stream=True)
+            kaggle_df = ETL.extract(paths['kaggle'])
+            rows['rows_out'] = kaggle_df.shape[0]
+        with profiling.stage('transform') as rows:
+            df, n_ratings = ETL.transform(wiki_data, kaggle_df, paths['ratings'], reduced_path,
+                                          chunksize=chunksize, n_workers=n_workers)
+            rows['rows_out'] = df.shape[0]
+        with profiling.stage('load'):
+            ETL.load(sqlite_safe(df), uri=uri)
+            ETL.load(reduced_path, table='ratings', n_ratings=n_ratings, uri=uri,
+                     n_workers=load_workers, method=method)
+    return report.to_dict()
+
+
+def bench_pipeline(scales=(1, 10), chunksize=None, n_workers=None, load_workers=1, data_dir=None):
+
+    """
+    Time an end-to-end run of the pipeline against SQLite on synthetic raw
+    data at multiples of the current movie count (with 100 ratings per
+    movie), reporting the wall time of each stage and sub-step.
+
+    Parameters
+    ----------
+    scales : tuple(int), optional
+        Multiples of `generators.BASE_ROWS` movies to benchmark, by default
+        (1, 10)
+    chunksize : int, optional
+        Number of rows per chunk when streaming the rating data, by default
+        None (read into memory all at once)
+    n_workers : int, optional
+        Number of worker processes cleaning the Wikipedia data, by default None
+    load_workers : int, optional
+        Number of threads loading the rating data, by default 1
+    data_dir : str, optional
+        Directory to write the synthetic data and database to, by default a
+        temporary directory removed after the run
+
+    Returns
+    -------
+    Pandas dataframe
+        Wall time in seconds of each stage, total wall time, and peak RSS in
+        MiB at each scale
+    """
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for scale in scales:
+            scale_dir = os.path.join(data_dir or tmp_dir, f'scale_{scale}')
+            paths = generators.write_dataset(scale_dir, scale)
+            report = run_pipeline(paths, scale_dir, chunksize, n_workers, load_workers)
+
+            # Wall time of the stages 2 levels deep (e.g. 'transform/join_data')
+            row = {'scale': scale, 'movies': generators.BASE_ROWS * scale,
+                   'ratings': generators.BASE_ROWS * scale * 100}
+            for stage in report['stages']:
+                if stage['stage'].count('/') < 2:
+                    row[stage['stage']] = stage['wall_seconds']
+            row['total'] = report['wall_seconds']
+            row['peak_rss_mb'] = report['peak_rss_mb']
+            results.append(row)
+            print(row)
+
+    return pd.DataFrame(results)
+
+
+if __name__ == '__main__':
+    bench_pipeline()
@@ -0,0 +1,51 @@
+import timeit
+import pandas as pd
+
+from utils import udf_kaggle, udf_movies
+from benchmarks import generators
+
+
+def bench_clean_kaggle_movies(scales=(1, 10, 100), repeat=3):
+
+    """
+    Time each step of `clean_kaggle_movies()` (dropping duplicates, dropping
+    adult videos and unused columns, and recasting columns) on synthetic
+    Kaggle movie metadata at multiples of the current row count.
+
+    Parameters
+    ----------
+    scales : tuple(int), optional
+        Multiples of `generators.BASE_ROWS` to benchmark, by default (1, 10, 100)
+    repeat : int, optional
+        Number of timed runs per step (best run is reported), by default 3
+
+    Returns
+    -------
+    Pandas dataframe
+        Best run time in seconds of each step and of the whole cleaning at
+        each scale
+    """
+
+    results = []
+    for scale in scales:
+        movies_df = generators.kaggle_movies(generators.BASE_ROWS * scale)
+        deduped_df = udf_movies.drop_duplicates(movies_df.copy())
+        dropped_df = udf_kaggle.drop_cols(deduped_df)
+
+        # Time each step on a fresh copy of its input
+        row = {'scale': scale, 'rows': movies_df.shape[0]}
+        steps = [('drop_duplicates', udf_movies.drop_duplicates, movies_df),
+                 ('drop_cols', udf_kaggle.drop_cols, deduped_df),
+                 ('recast_cols', udf_kaggle.recast_cols, dropped_df),
+                 ('clean_kaggle_movies', udf_kaggle.clean_kaggle_movies, movies_df)]
+        for name, step, df in steps:
+            row[name] = min(timeit.repeat(lambda: step(df.copy()), repeat=repeat, number=1))
+        row['rows_per_sec'] = row['rows'] / row['clean_kaggle_movies']
+        results.append(row)
+        print(row)
+
+    return pd.DataFrame(results)
+
+
+if __name__ == '__main__':
+    bench_clean_kaggle_movies()
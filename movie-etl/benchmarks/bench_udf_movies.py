@@ -0,0 +1,72 @@
+import timeit
+import pandas as pd
+
+from utils import udf_movies
+from benchmarks import generators
+
+
+# Pairs of redundant columns filled and dropped in the joined movie data
+redundant_pairs = [
+    ['box_office', 'revenue'],
+    ['budget_wiki', 'budget_kaggle'],
+    ['runtime', 'duration']
+]
+
+
+def rowwise(movies_df):
+
+    """ Fill and drop the redundant columns one pair at a time with `filla_dropb()` """
+
+    for a, b in redundant_pairs:
+        movies_df = udf_movies.filla_dropb(a, b, movies_df)
+    return movies_df
+
+
+def columnar(movies_df):
+
+    """ Fill and drop all the redundant columns at once with `fill_and_drop()` """
+
+    return udf_movies.fill_and_drop(movies_df, redundant_pairs)
+
+
+def bench_fill_and_drop(scales=(1, 10, 100), repeat=3):
+
+    """
+    Time the row-wise and columnar fill-and-drop engines on synthetic joined 
+    movie data at multiples of the current row count, checking that both 
+    engines return identical data.
+
+    Parameters
+    ----------
+    scales : tuple(int), optional
+        Multiples of `generators.BASE_ROWS` to benchmark, by default (1, 10, 100)
+    repeat : int, optional
+        Number of timed runs per engine (best run is reported), by default 3
+
+    Returns
+    -------
+    Pandas dataframe
+        Best run time in seconds of each engine at each scale
+    """
+
+    results = []
+    for scale in scales:
+        movies_df = generators.joined_movies(generators.BASE_ROWS * scale)
+
+        # Check that both engines agree
+        pd.testing.assert_frame_equal(rowwise(movies_df.copy()), columnar(movies_df.copy()))
+
+        # Time each engine on a fresh copy of the data
+        row = {'scale': scale, 'rows': movies_df.shape[0]}
+        for name, engine in [('rowwise', rowwise), ('columnar', columnar)]:
+            row[name] = min(timeit.repeat(lambda: engine(movies_df.copy()), 
+                                          repeat=repeat, number=1))
+        row['speedup'] = row['rowwise'] / row['columnar']
+        results.append(row)
+        print(row)
+
+    return pd.DataFrame(results)
+
+
+if __name__ == '__main__':
+    bench_fill_and_drop()
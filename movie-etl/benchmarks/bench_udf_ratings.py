@@ -0,0 +1,64 @@
+import timeit
+import pandas as pd
+
+from utils import udf_ratings
+from benchmarks import generators
+
+
+def pivot(ratings_df):
+
+    """ Count ratings by movie with the original `pd.pivot_table()` engine """
+
+    return pd.pivot_table(data=ratings_df, index='movieId', columns='rating',
+                          values='timestamp', aggfunc='count', fill_value=0)
+
+
+def histogram(ratings_df):
+
+    """ Count ratings by movie with the `np.bincount()` engine of `count_ratings()` """
+
+    return udf_ratings.count_ratings(ratings_df)
+
+
+def bench_count_ratings(scales=(1, 10, 100), repeat=3):
+
+    """
+    Time the pivot table and histogram rating count engines on synthetic
+    rating data at multiples of 100x `generators.BASE_ROWS` rows, checking
+    that both engines return the same counts.
+
+    Parameters
+    ----------
+    scales : tuple(int), optional
+        Multiples of 100x `generators.BASE_ROWS` to benchmark, by default
+        (1, 10, 100)
+    repeat : int, optional
+        Number of timed runs per engine (best run is reported), by default 3
+
+    Returns
+    -------
+    Pandas dataframe
+        Best run time in seconds of each engine at each scale
+    """
+
+    results = []
+    for scale in scales:
+        ratings_df = generators.ratings(generators.BASE_ROWS * 100 * scale)
+
+        # Check that both engines agree
+        pd.testing.assert_frame_equal(pivot(ratings_df), histogram(ratings_df), check_dtype=False)
+
+        # Time each engine
+        row = {'scale': scale, 'rows': ratings_df.shape[0]}
+        for name, engine in [('pivot', pivot), ('histogram', histogram)]:
+            row[name] = min(timeit.repeat(lambda: engine(ratings_df),
+                                          repeat=repeat, number=1))
+        row['speedup'] = row['pivot'] / row['histogram']
+        results.append(row)
+        print(row)
+
+    return pd.DataFrame(results)
+
+
+if __name__ == '__main__':
+    bench_count_ratings()
@@ -0,0 +1,274 @@
+import timeit
+import numpy as np
+import pandas as pd
+
+from utils import udf_wiki
+from benchmarks import generators
+
+
+# Column recasters and the formats they keep
+recasters = {
+    'budget': udf_wiki.budget_to_num,
+    'box_office': udf_wiki.box_office_to_num,
+    'duration': udf_wiki.duration_to_num
+}
+formats = {column: udf_wiki.patterns[column] for column in recasters}
+
+# Scalar and vectorized parsers of each column, by the formats they extract
+parsers = {
+    'budget': (udf_wiki.parse_budget, 'budget_parts', udf_wiki.parse_budget_parts),
+    'box_office': (udf_wiki.parse_box_office, 'box_office_parts', udf_wiki.parse_box_office_parts),
+    'duration': (udf_wiki.parse_duration, 'duration_parts', udf_wiki.parse_duration_parts)
+}
+
+
+def replace_loop(values, formats):
+
+    """ Previous unmatched-value handling: one `replace()` per unique unmatched value """
+
+    contains = values.dropna().str.contains(formats)
+    for val in values.dropna()[~contains].unique():
+        values.replace(val, np.NaN, inplace=True)
+    return values
+
+
+def bench_drop_unmatched(sizes=(1000, 4000, 16000), noise=0.3, repeat=3):
+
+    """
+    Time the replace-loop and masked-assignment handling of unmatched values 
+    on synthetic dirty wiki columns, checking that both agree. The loop grows 
+    with (unique unmatched values x rows) while the mask grows with rows.
+
+    Parameters
+    ----------
+    sizes : tuple(int), optional
+        Numbers of rows to benchmark, by default (1000, 4000, 16000)
+    noise : float, optional
+        Share of unparseable values, by default 0.3
+    repeat : int, optional
+        Number of timed runs per method (best run is reported), by default 3
+
+    Returns
+    -------
+    Pandas dataframe
+        Best run time in seconds of each method for each column and size
+    """
+
+    results = []
+    for column, fmt in formats.items():
+        for n_rows in sizes:
+            values = generators.dirty_wiki_column(column, n_rows, noise).apply(udf_wiki.obj_to_str)
+
+            # Check that both methods agree
+            pd.testing.assert_series_equal(replace_loop(values.copy(), fmt), 
+                                           udf_wiki.drop_unmatched(values.copy(), fmt))
+
+            # Time each method on a fresh copy of the column
+            row = {'column': column, 'rows': n_rows}
+            for name, method in [('loop', replace_loop), ('mask', udf_wiki.drop_unmatched)]:
+                row[name] = min(timeit.repeat(lambda: method(values.copy(), fmt), 
+                                              repeat=repeat, number=1))
+            results.append(row)
+            print(row)
+
+    return pd.DataFrame(results)
+
+
+def bench_recasters(sizes=(10000, 100000, 1000000), noise=0.3, repeat=3):
+
+    """
+    Time the `budget`, `box_office`, and `duration` recasters on synthetic 
+    dirty wiki columns of increasing size. Linear scaling shows as a flat 
+    time per row.
+
+    Parameters
+    ----------
+    sizes : tuple(int), optional
+        Numbers of rows to benchmark, by default (10000, 100000, 1000000)
+    noise : float, optional
+        Share of unparseable values, by default 0.3
+    repeat : int, optional
+        Number of timed runs per recaster (best run is reported), by default 3
+
+    Returns
+    -------
+    Pandas dataframe
+        Best run time in seconds and time per row of each recaster at each size
+    """
+
+    results = []
+    for column, recaster in recasters.items():
+        for n_rows in sizes:
+            values = generators.dirty_wiki_column(column, n_rows, noise)
+            seconds = min(timeit.repeat(lambda: recaster(values), repeat=repeat, number=1))
+            row = {'column': column, 'rows': n_rows, 'seconds': seconds, 
+                   'us_per_row': seconds / n_rows * 1e6}
+            results.append(row)
+            print(row)
+
+    return pd.DataFrame(results)
+
+
+def bench_parsers(sizes=(1000, 100000, 1000000), noise=0.3, repeat=3):
+
+    """
+    Micro-benchmark each parser with its compiled patterns from 
+    `udf_wiki.patterns` on synthetic dirty wiki columns, so that changes to 
+    the cleaning rules can be checked for throughput regressions. For each 
+    column, the values captured by its formats are parsed with the scalar 
+    parser (applied to each value) and the vectorized parser (including the 
+    named-group extraction), and `release_date` is parsed end to end one 
+    value at a time and by format bucket.
+
+    Parameters
+    ----------
+    sizes : tuple(int), optional
+        Numbers of values to benchmark, by default (1000, 100000, 1000000)
+    noise : float, optional
+        Share of unparseable values, by default 0.3
+    repeat : int, optional
+        Number of timed runs per parser (best run is reported), by default 3
+
+    Returns
+    -------
+    Pandas dataframe
+        Best run time in seconds and time per value of each parser at each size
+    """
+
+    def time_parser(column, parser, n_values, func):
+        seconds = min(timeit.repeat(func, repeat=repeat, number=1))
+        row = {'column': column, 'parser': parser, 'values': n_values, 'seconds': seconds, 
+               'us_per_value': seconds / n_values * 1e6}
+        print(row)
+        return row
+
+    results = []
+    for n_values in sizes:
+
+        # Captured values of each column
+        for column, (scalar, parts_name, vectorized) in parsers.items():
+            values = generators.dirty_wiki_column(column, n_values, noise).apply(udf_wiki.obj_to_str)
+            values = udf_wiki.drop_unmatched(values, formats[column])
+            extracted = values.str.extract(formats[column])[0]
+            parts_pattern = udf_wiki.patterns[parts_name]
+            results.append(time_parser(column, scalar.__name__, n_values, 
+                                       lambda: extracted.apply(scalar)))
+            results.append(time_parser(column, vectorized.__name__, n_values, 
+                                       lambda: vectorized(values.str.extract(parts_pattern))))
+
+        # Release dates, parsed by `pd.to_datetime()` on the whole column or by format bucket
+        dates = generators.dirty_wiki_column('release_date', n_values, noise)
+        for parser, vectorized in [('to_datetime', False), ('parse_dates', True)]:
+            udf_wiki.parse_date.cache_clear()
+            results.append(time_parser('release_date', parser, n_values, 
+                                       lambda: udf_wiki.release_date_to_dt(dates, vectorized)))
+
+    return pd.DataFrame(results)
+
+
+def two_pass(wiki_movies):
+
+    """ Previous record cleaning: `filter_for_movies()`, then `clean_movie()` on each movie """
+
+    return pd.DataFrame([udf_wiki.clean_movie(movie) for movie in udf_wiki.filter_for_movies(wiki_movies)])
+
+
+def single_pass(wiki_movies):
+
+    """ Filter and clean records in a single pass with the `clean_movies()` generator """
+
+    return pd.DataFrame(udf_wiki.clean_movies(wiki_movies))
+
+
+def bench_clean_movies(sizes=(10000, 100000, 1000000), repeat=3):
+
+    """
+    Time the two-pass and single-pass filtering and key renaming of synthetic 
+    Wikipedia infobox records, including the dataframe construction, checking 
+    that both return the same data.
+
+    Parameters
+    ----------
+    sizes : tuple(int), optional
+        Numbers of records to benchmark, by default (10000, 100000, 1000000)
+    repeat : int, optional
+        Number of timed runs per method (best run is reported), by default 3
+
+    Returns
+    -------
+    Pandas dataframe
+        Best run time in seconds of each method at each size
+    """
+
+    results = []
+    for n_records in sizes:
+        wiki_movies = generators.wiki_infoboxes(n_records)
+
+        # Check that both methods agree
+        pd.testing.assert_frame_equal(two_pass(wiki_movies), single_pass(wiki_movies))
+
+        # Time each method
+        row = {'records': n_records}
+        for name, method in [('two_pass', two_pass), ('single_pass', single_pass)]:
+            row[name] = min(timeit.repeat(lambda: method(wiki_movies), repeat=repeat, number=1))
+        results.append(row)
+        print(row)
+
+    return pd.DataFrame(results)
+
+
+def bench_clean_wiki_movies(sizes=(10000, 100000), workers=(2, 4), repeat=3):
+
+    """
+    Time serial and multi-process cleaning of synthetic Wikipedia infobox 
+    records with `clean_wiki_movies()`, checking that each returns the same 
+    data. The last quarter of the records have no budget, box office, or 
+    release date, so that the last shard of 4 workers has none of these columns.
+
+    Parameters
+    ----------
+    sizes : tuple(int), optional
+        Numbers of records to benchmark, by default (10000, 100000)
+    workers : tuple(int), optional
+        Numbers of worker processes to benchmark, by default (2, 4)
+    repeat : int, optional
+        Number of timed runs per method (best run is reported), by default 3
+
+    Returns
+    -------
+    Pandas dataframe
+        Best run time in seconds of serial cleaning and of each number of 
+        workers at each size
+    """
+
+    results = []
+    for n_records in sizes:
+        wiki_movies = generators.wiki_infoboxes(n_records)
+        for movie in wiki_movies[-(n_records // 4):]:
+            for key in ['Budget', 'Box office', 'Release date']:
+                movie.pop(key, None)
+
+        # Check that each number of workers agrees with serial cleaning
+        serial = udf_wiki.clean_wiki_movies(wiki_movies)
+        for n_workers in workers:
+            pd.testing.assert_frame_equal(serial, udf_wiki.clean_wiki_movies(wiki_movies, n_workers))
+
+        # Time each method
+        row = {'records': n_records}
+        row['serial'] = min(timeit.repeat(lambda: udf_wiki.clean_wiki_movies(wiki_movies), 
+                                          repeat=repeat, number=1))
+        for n_workers in workers:
+            row[f'workers_{n_workers}'] = min(timeit.repeat(
+                lambda: udf_wiki.clean_wiki_movies(wiki_movies, n_workers), repeat=repeat, number=1))
+        results.append(row)
+        print(row)
+
+    return pd.DataFrame(results)
+
+
+if __name__ == '__main__':
+    bench_drop_unmatched()
+    bench_recasters()
+    bench_parsers()
+    bench_clean_movies()
+    bench_clean_wiki_movies()
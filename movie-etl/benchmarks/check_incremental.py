@@ -0,0 +1,130 @@
+import os
+import tempfile
+import contextlib
+import pandas as pd
+
+import ETL
+from utils import profiling, formats
+from benchmarks import generators, bench_pipeline
+
+
+# Stages of `ETL.incremental_etl_pipeline()` as recorded in its run report
+all_stages = {'clean_wiki_movies', 'clean_kaggle_movies', 'join_movie_data', 'reduce_ratings',
+              'load_movies', 'load_ratings'}
+
+
+def run_incremental(paths, data_dir, uri):
+
+    """
+    Run `ETL.incremental_etl_pipeline()` on a synthetic dataset, loading into
+    SQLite, and get the stages that were rerun from its run report.
+
+    Parameters
+    ----------
+    paths : dict
+        Paths to the data files from `generators.write_dataset()`
+    data_dir : str
+        Directory to write the reduced rating data, checkpoints, and run
+        report to
+    uri : str
+        SQLite connection string
+
+    Returns
+    -------
+    Pandas dataframe
+        Joined movie data with aggregate rating data
+    Set[str]
+        Names of the stages that were rerun
+    """
+
+    # Load list values as text, since SQLite has no array type
+    load = ETL.load
+    ETL.load = lambda data, *args, **kwargs: load(
+        bench_pipeline.sqlite_safe(data) if isinstance(data, pd.DataFrame) else data,
+        *args, uri=uri, **kwargs)
+    try:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull), \
+                profiling.run(os.path.join(data_dir, 'run.json')) as report:
+            df = ETL.incremental_etl_pipeline(paths['wiki'], paths['kaggle'], paths['ratings'],
+                                              os.path.join(data_dir, 'ratings_reduced.csv'),
+                                              checkpoint_dir=os.path.join(data_dir, 'checkpoints'))
+    finally:
+        ETL.load = load
+
+    # Stages 2 levels deep (e.g. 'transform/reduce_ratings')
+    ran = {stage['stage'].split('/')[1] for stage in report.stages if stage['stage'].count('/') == 1}
+    return df, ran
+
+
+def check_incremental(scale=1, data_dir=None):
+
+    """
+    Check which stages `ETL.incremental_etl_pipeline()` reruns on synthetic
+    raw data, and that its output matches a full run:
+    1. First run            -   every stage runs
+    2. Unchanged rerun      -   no stage runs
+    3. New rating data      -   only the rating stage and the table loads run
+    4. Edited source file   -   every stage runs (`utils/formats.py` is
+                                appended a blank line, and restored after)
+
+    Parameters
+    ----------
+    scale : int, optional
+        Multiple of `generators.BASE_ROWS` movies to check with, by default 1
+    data_dir : str, optional
+        Directory to write the synthetic data, checkpoints, and database to,
+        by default a temporary directory removed after the check
+
+    Returns
+    -------
+    Pandas dataframe
+        Stages expected and rerun in each step
+
+    Raises
+    ------
+    AssertionError
+        A step reran the wrong stages, or returned different data than a
+        full run
+    """
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        data_dir = data_dir or tmp_dir
+        paths = generators.write_dataset(data_dir, scale)
+        uri = f'sqlite:///{os.path.join(data_dir, "movies.db")}'
+
+        # Helper function to run a step and check it against a full run
+        def step(name, expected):
+            df, ran = run_incremental(paths, data_dir, uri)
+            full_df, _ = ETL.transform(ETL.extract(paths['wiki'], 'json'), ETL.extract(paths['kaggle']),
+                                       paths['ratings'], os.path.join(data_dir, 'ratings_full.csv'))
+            results.append({'step': name, 'expected': sorted(expected), 'ran': sorted(ran)})
+            print(results[-1])
+            assert ran == expected, f'{name}: expected {sorted(expected)}, ran {sorted(ran)}'
+            pd.testing.assert_frame_equal(df, full_df)
+
+        step('first_run', all_stages)
+        step('unchanged', set())
+
+        # New rating data
+        n_movies = generators.BASE_ROWS * scale
+        generators.ratings(n_movies * 100, n_movies, seed=1).to_csv(paths['ratings'], index=False)
+        step('new_ratings', {'reduce_ratings', 'load_movies', 'load_ratings'})
+
+        # Edited source file
+        source_path = formats.__file__
+        with open(source_path, 'rb') as f:
+            source = f.read()
+        try:
+            with open(source_path, 'ab') as f:
+                f.write(b'\n')
+            step('edited_source', all_stages)
+        finally:
+            with open(source_path, 'wb') as f:
+                f.write(source)
+
+    return pd.DataFrame(results)
+
+
+if __name__ == '__main__':
+    check_incremental()
@@ -0,0 +1,307 @@
+import os
+import json
+import numpy as np
+import pandas as pd
+
+
+# Approximate number of rows in the joined movie data
+BASE_ROWS = 6000
+
+
+def joined_movies(n_rows=BASE_ROWS, seed=0):
+
+    """
+    Generate synthetic joined movie data with the redundant column pairs that 
+    `udf_movies.drop_redundant_cols()` fills and drops. Roughly a third of the 
+    values in each column are missing or 0.
+
+    Parameters
+    ----------
+    n_rows : int, optional
+        Number of rows to generate, by default `BASE_ROWS`
+    seed : int, optional
+        Random seed, by default 0
+
+    Returns
+    -------
+    Pandas dataframe
+        Synthetic joined movie data
+    """
+
+    rng = np.random.default_rng(seed)
+
+    # Helper function to generate a numeric column with missing and 0 values
+    def sparse_col(low, high, integer=False):
+        col = rng.integers(low, high, n_rows).astype(float)
+        col[rng.random(n_rows) < 0.15] = 0
+        if integer:
+            return col.astype(np.int64)
+        col[rng.random(n_rows) < 0.2] = np.nan
+        return col
+
+    return pd.DataFrame({
+        'imdb_id': [f'tt{i:07d}' for i in range(n_rows)],
+        'title': rng.choice(['Alien', 'Heat', 'Fargo', 'Clue'], n_rows),
+        'box_office': sparse_col(1e5, 1e9),
+        'revenue': sparse_col(1e5, 1e9),
+        'budget_wiki': sparse_col(1e5, 3e8),
+        'budget_kaggle': sparse_col(1e5, 3e8, integer=True),
+        'runtime': sparse_col(60, 200),
+        'duration': sparse_col(60, 200)
+    })
+
+
+# Value templates for dirty Wikipedia columns
+wiki_templates = {
+    'budget': ['${a}.{b} million', '$ {a} mil', '${a},{c},{c}', 'US$ {a},{c}', 
+               '${a}–{b} million', '${a},{c},{c} [1]'],
+    'box_office': ['${a}.{b} million', '$ {a}.{b} billion', '${a},{c},{c}', 
+                   '$ {a}.{c}.{c}', '{a}k', '${a} {c} {c}'],
+    'duration': ['{m} minutes', '{h} hours {m} min', '{h}h {m}m', '{m} min [1]', 
+                 '{m}:{s}', '{m}–{m} minutes'],
+    'release_date': ['{mon} {d}, {y}', '{d} {mon} {y}', '{y}-{mo:02d}-{d:02d}', '{y}', 
+                     '{mon} {d} – {m}, {y}', '{mon} {d}, {y} (premiere)']
+}
+
+
+def dirty_wiki_column(column, n_rows=BASE_ROWS, noise=0.3, seed=0):
+
+    """
+    Generate a synthetic dirty Wikipedia `budget`, `box_office`, `duration`, 
+    or `release_date` column. Clean values follow the formats found in the scraped data, a 
+    `noise` share of the values are unique strings that no format captures, 
+    and about 5% of the values are lists or missing.
+
+    Parameters
+    ----------
+    column : str
+        'budget', 'box_office', 'duration', or 'release_date'
+    n_rows : int, optional
+        Number of rows to generate, by default `BASE_ROWS`
+    noise : float, optional
+        Share of unparseable values, by default 0.3
+    seed : int, optional
+        Random seed, by default 0
+
+    Returns
+    -------
+    Pandas series[obj]
+        Synthetic dirty column
+    """
+
+    rng = np.random.default_rng(seed)
+    templates = wiki_templates[column]
+
+    # Random template and number fill-ins for each row
+    template_idx = rng.integers(0, len(templates), n_rows)
+    a, b, c = rng.integers(1, 1000, n_rows), rng.integers(0, 100, n_rows), rng.integers(0, 1000, n_rows)
+    h, m, s = rng.integers(1, 4, n_rows), rng.integers(1, 60, n_rows), rng.integers(0, 60, n_rows)
+    kind = rng.random(n_rows)
+    y, mo, d = rng.integers(1900, 2020, n_rows), rng.integers(1, 13, n_rows), rng.integers(1, 29, n_rows)
+    month_names = pd.date_range('2000-01-01', periods=12, freq='MS').month_name()
+
+    values = []
+    for i in range(n_rows):
+        if kind[i] < noise: # unique unparseable value (dates can't hold numbers)
+            values.append('to be announced' if column == 'release_date' else f'see note {i} (unconfirmed)')
+        elif kind[i] < noise + 0.025: # missing value
+            values.append(np.nan)
+        else:
+            value = templates[template_idx[i]].format(a=a[i], b=b[i], c=f'{c[i]:03d}', 
+                                                      h=h[i], m=m[i], s=s[i], y=y[i], mo=mo[i], 
+                                                      mon=month_names[mo[i] - 1], d=d[i])
+            values.append([value, value] if kind[i] < noise + 0.05 else value)
+
+    return pd.Series(values, dtype=object)
+
+
+def wiki_infoboxes(n_records=BASE_ROWS, seed=0):
+
+    """
+    Generate synthetic scraped Wikipedia infobox records in the same JSON 
+    layout as the raw Wikipedia movie data. About 10% of the records are TV 
+    shows or are missing an `imdb_link`, and about 5% reuse the IMDb id of an 
+    earlier record.
+
+    Parameters
+    ----------
+    n_records : int, optional
+        Number of records to generate, by default `BASE_ROWS`
+    seed : int, optional
+        Random seed, by default 0
+
+    Returns
+    -------
+    List[dict]
+        Synthetic Wikipedia movie data in JSON format
+    """
+
+    rng = np.random.default_rng(seed)
+    months = ['January', 'March', 'June', 'July', 'September', 'December']
+    people = ['Ann Lee', 'Bo Kim', 'Cy Park', 'Di Chen', 'Ed Ruiz', 'Flo Diaz']
+
+    # Dirty column values
+    budgets = dirty_wiki_column('budget', n_records, noise=0.1, seed=seed)
+    box_offices = dirty_wiki_column('box_office', n_records, noise=0.1, seed=seed + 1)
+    durations = dirty_wiki_column('duration', n_records, noise=0.05, seed=seed + 2)
+
+    records = []
+    for i in range(n_records):
+        year = int(rng.integers(1990, 2019))
+        month, day = months[rng.integers(0, len(months))], int(rng.integers(1, 29))
+        imdb_id = int(rng.integers(0, i)) if i and rng.random() < 0.05 else i
+        release_date = [f'{month} {day}, {year}', f'{day} {month} {year}', 
+                        f'{year}-{rng.integers(1, 13):02d}-{day:02d}', str(year), 
+                        [f'{month} {day}, {year} (premiere)', f'{month} {day}, {year}']]
+
+        record = {
+            'url': f'https://en.wikipedia.org/wiki/Film_{i}',
+            'year': year,
+            'imdb_link': f'https://www.imdb.com/title/tt{imdb_id:07d}/',
+            'title': f'Film {i}',
+            'Directed by' if rng.random() < 0.8 else 'Director': people[i % len(people)],
+            'Running time' if rng.random() < 0.8 else 'Length': durations[i],
+            'Starring': list(rng.choice(people, 3, replace=False)),
+            'Written by': people[(i + 1) % len(people)],
+            'Cinematography': people[(i + 2) % len(people)],
+            'Edited by': people[(i + 3) % len(people)],
+            'Music by': people[(i + 4) % len(people)],
+            'Produced by': list(rng.choice(people, 2, replace=False)),
+            'Distributed by': 'Studio Pictures',
+            'Country': 'United States',
+            'Language': 'English',
+            'Budget': budgets[i],
+            'Box office': box_offices[i],
+            'Release date': release_date[rng.integers(0, len(release_date))]
+        }
+
+        # TV shows and records without an IMDb link
+        kind = rng.random()
+        if kind < 0.05:
+            record['No. of seasons'] = int(rng.integers(1, 10))
+        elif kind < 0.1:
+            del record['imdb_link']
+
+        records.append(record)
+
+    return records
+
+
+def kaggle_movies(n_rows=BASE_ROWS, seed=0):
+
+    """
+    Generate synthetic Kaggle movie metadata with the same columns as 
+    `movies_metadata.csv`. IMDb ids line up with the records of 
+    `wiki_infoboxes()` with the same `n_rows` so the 2 sources can be joined, 
+    and Kaggle ids are `n_rows` offset from the IMDb ids.
+
+    Parameters
+    ----------
+    n_rows : int, optional
+        Number of rows to generate, by default `BASE_ROWS`
+    seed : int, optional
+        Random seed, by default 0
+
+    Returns
+    -------
+    Pandas dataframe
+        Synthetic Kaggle movie data as read from the CSV file
+    """
+
+    rng = np.random.default_rng(seed)
+    ids = np.arange(n_rows)
+    release_dates = pd.to_datetime('1990-01-01') + pd.to_timedelta(rng.integers(0, 10000, n_rows), 'D')
+
+    return pd.DataFrame({
+        'adult': np.where(rng.random(n_rows) < 0.01, 'True', 'False'),
+        'belongs_to_collection': np.nan,
+        'budget': np.where(rng.random(n_rows) < 0.5, 0, rng.integers(1e5, 3e8, n_rows)).astype(str),
+        'genres': "[{'id': 18, 'name': 'Drama'}]",
+        'homepage': np.nan,
+        'id': (ids + n_rows).astype(str),
+        'imdb_id': [f'tt{i:07d}' for i in ids],
+        'original_language': rng.choice(['en', 'fr', 'ja'], n_rows),
+        'original_title': [f'Film {i}' for i in ids],
+        'overview': 'A film.',
+        'popularity': rng.random(n_rows).round(6).astype(str),
+        'poster_path': [f'/{i}.jpg' for i in ids],
+        'production_companies': "[{'name': 'Studio', 'id': 1}]",
+        'production_countries': "[{'iso_3166_1': 'US', 'name': 'United States of America'}]",
+        'release_date': release_dates.strftime('%Y-%m-%d'),
+        'revenue': np.where(rng.random(n_rows) < 0.5, 0, rng.integers(1e5, 1e9, n_rows)).astype(float),
+        'runtime': np.where(rng.random(n_rows) < 0.1, np.nan, rng.integers(60, 200, n_rows)),
+        'spoken_languages': "[{'iso_639_1': 'en', 'name': 'English'}]",
+        'status': rng.choice(['Released', 'Rumored', 'Post Production'], n_rows, p=[0.98, 0.01, 0.01]),
+        'tagline': np.nan,
+        'title': [f'Film {i}' for i in ids],
+        'video': False,
+        'vote_average': rng.integers(0, 100, n_rows) / 10,
+        'vote_count': rng.integers(0, 5000, n_rows).astype(float)
+    })
+
+
+def ratings(n_rows=BASE_ROWS * 100, n_movies=BASE_ROWS, seed=0):
+
+    """
+    Generate synthetic Kaggle rating data with the same columns as 
+    `ratings.csv`. Movie ids cover the Kaggle ids of `kaggle_movies()` with 
+    the same `n_rows` as `n_movies`, plus as many ids not in the movie data.
+
+    Parameters
+    ----------
+    n_rows : int, optional
+        Number of rows to generate, by default 100x `BASE_ROWS`
+    n_movies : int, optional
+        Number of movies in the movie data, by default `BASE_ROWS`
+    seed : int, optional
+        Random seed, by default 0
+
+    Returns
+    -------
+    Pandas dataframe
+        Synthetic Kaggle rating data as read from the CSV file
+    """
+
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'userId': rng.integers(1, 270000, n_rows),
+        'movieId': rng.integers(n_movies, 3 * n_movies, n_rows),
+        'rating': rng.integers(1, 11, n_rows) / 2,
+        'timestamp': rng.integers(789652009, 1501829870, n_rows)
+    })
+
+
+def write_dataset(data_dir, scale=1, seed=0):
+
+    """
+    Write a synthetic copy of the raw data files at `scale` times the size of 
+    the joined movie data: the Wikipedia movie JSON, the Kaggle movie 
+    metadata CSV, and the Kaggle ratings CSV (100 ratings per movie).
+
+    Parameters
+    ----------
+    data_dir : str
+        Directory to write the data files to
+    scale : int, optional
+        Multiple of `BASE_ROWS` movies to generate, by default 1
+    seed : int, optional
+        Random seed, by default 0
+
+    Returns
+    -------
+    Dict
+        Paths to the `wiki`, `kaggle`, and `ratings` data files
+    """
+
+    os.makedirs(data_dir, exist_ok=True)
+    n_movies = BASE_ROWS * scale
+    paths = {'wiki': os.path.join(data_dir, 'wikipedia.movies.json'), 
+             'kaggle': os.path.join(data_dir, 'movies_metadata.csv'), 
+             'ratings': os.path.join(data_dir, 'ratings.csv')}
+
+    # Write each source
+    with open(paths['wiki'], 'w') as f:
+        json.dump(wiki_infoboxes(n_movies, seed), f, default=str)
+    kaggle_movies(n_movies, seed).to_csv(paths['kaggle'], index=False)
+    ratings(n_movies * 100, n_movies, seed).to_csv(paths['ratings'], index=False)
+    return paths
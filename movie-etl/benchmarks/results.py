@@ -0,0 +1,128 @@
+import os
+import platform
+import subprocess
+import datetime as dt
+import pandas as pd
+
+
+# Directory that benchmark results are stored in, 1 JSON lines file per suite
+results_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+
+def git_commit():
+
+    """
+    Get the short hash of the checked out commit, marked with '+' if the
+    working tree has uncommitted changes.
+
+    Returns
+    -------
+    Str or None
+        Commit hash, or None if not run from a git repository
+    """
+
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=cwd,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=cwd,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + '+' if dirty else commit
+
+
+def save_results(suite, results, results_dir=results_dir):
+
+    """
+    Append the results of a benchmark suite to `{results_dir}/{suite}.jsonl`,
+    tagged with the commit, time, Python version, and machine they were run
+    on, so that runs can be compared across commits (see `compare()`).
+
+    Parameters
+    ----------
+    suite : str
+        Name of the benchmark suite (e.g. 'udf_ratings.count_ratings')
+    results : Pandas dataframe
+        Results returned by the suite
+    results_dir : str, optional
+        Directory to save results to, by default the `results` subdirectory
+        of this package
+
+    Returns
+    -------
+    Pandas dataframe
+        Saved results with their run tags
+    """
+
+    os.makedirs(results_dir, exist_ok=True)
+    tagged = results.assign(commit=git_commit(), run_at=dt.datetime.now().isoformat(timespec='seconds'),
+                            python=platform.python_version(), machine=platform.machine())
+    with open(os.path.join(results_dir, f'{suite}.jsonl'), 'a') as f:
+        tagged.to_json(f, orient='records', lines=True)
+        f.write('\n')
+    return tagged
+
+
+def load_results(suite, results_dir=results_dir):
+
+    """
+    Read every stored run of a benchmark suite.
+
+    Parameters
+    ----------
+    suite : str
+        Name of the benchmark suite
+    results_dir : str, optional
+        Directory results were saved to, by default the `results`
+        subdirectory of this package
+
+    Returns
+    -------
+    Pandas dataframe
+        Results of each run in the order they were saved
+    """
+
+    return pd.read_json(os.path.join(results_dir, f'{suite}.jsonl'), orient='records', lines=True)
+
+
+def compare(suite, metric, keys, base=None, head=None, results_dir=results_dir):
+
+    """
+    Compare a metric of a benchmark suite between 2 commits, using the latest
+    run of each commit.
+
+    Parameters
+    ----------
+    suite : str
+        Name of the benchmark suite
+    metric : str
+        Column of the results to compare (e.g. 'histogram')
+    keys : list[str]
+        Columns identifying each benchmark case (e.g. ['scale'])
+    base : str, optional
+        Commit to compare against, by default the second to last commit run
+    head : str, optional
+        Commit to compare, by default the last commit run
+    results_dir : str, optional
+        Directory results were saved to, by default the `results`
+        subdirectory of this package
+
+    Returns
+    -------
+    Pandas dataframe
+        Metric at each commit and their ratio (head / base) for each case
+    """
+
+    results = load_results(suite, results_dir)
+    commits = results['commit'].drop_duplicates().tolist()
+    head = head or commits[-1]
+    base = base or (commits[-2] if len(commits) > 1 else commits[-1])
+
+    # Latest run of each case at each commit
+    runs = [results[results['commit'] == commit].drop_duplicates(keys, keep='last')
+                .set_index(keys)[metric].rename(commit)
+            for commit in dict.fromkeys([base, head])]
+    comparison = pd.concat(runs, axis=1)
+    comparison['ratio'] = comparison[head] / comparison[base]
+    return comparison
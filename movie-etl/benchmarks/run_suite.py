@@ -0,0 +1,57 @@
+import sys
+
+from benchmarks import bench_udf_wiki, bench_udf_kaggle, bench_udf_movies, bench_udf_ratings
+from benchmarks import bench_pipeline, results
+
+
+# Benchmark suites and the columns identifying each of their cases
+suites = {
+    'udf_wiki.drop_unmatched': (bench_udf_wiki.bench_drop_unmatched, ['column', 'rows']),
+    'udf_wiki.recasters': (bench_udf_wiki.bench_recasters, ['column', 'rows']),
+    'udf_wiki.parsers': (bench_udf_wiki.bench_parsers, ['column', 'parser', 'values']),
+    'udf_wiki.clean_movies': (bench_udf_wiki.bench_clean_movies, ['records']),
+    'udf_wiki.clean_wiki_movies': (bench_udf_wiki.bench_clean_wiki_movies, ['records']),
+    'udf_kaggle.clean_kaggle_movies': (bench_udf_kaggle.bench_clean_kaggle_movies, ['scale']),
+    'udf_movies.fill_and_drop': (bench_udf_movies.bench_fill_and_drop, ['scale']),
+    'udf_ratings.count_ratings': (bench_udf_ratings.bench_count_ratings, ['scale']),
+    'pipeline.sqlite': (bench_pipeline.bench_pipeline, ['scale'])
+}
+
+
+def run_suite(names=None, save=True):
+
+    """
+    Run benchmark suites with their default sizes and store their results
+    for comparison across commits (see the `benchmarks.results` module).
+
+    Parameters
+    ----------
+    names : list[str], optional
+        Names of the suites (keys of `suites`) to run, or prefixes of them
+        (e.g. 'udf_wiki'), by default None (all suites)
+    save : bool, optional
+        Whether to store the results, by default True
+
+    Returns
+    -------
+    Dict
+        Results of each suite that was run
+    """
+
+    selected = [name for name in suites
+                if not names or any(name == n or name.startswith(n + '.') for n in names)]
+    if not selected:
+        raise ValueError('Invalid benchmark suite.')
+
+    suite_results = {}
+    for name in selected:
+        print(f'Running {name}...')
+        bench, _ = suites[name]
+        suite_results[name] = bench()
+        if save:
+            results.save_results(name, suite_results[name])
+    return suite_results
+
+
+if __name__ == '__main__':
+    run_suite(sys.argv[1:])
@@ -51,4 +51,26 @@ col_names = [
     'status', 'popularity', 'vote_average', 'vote_count', 
     'writers', 'director', 'cinematographers', 'editors', 'composers', 'stars', 
     'producers', 'production_companies', 'production_countries', 'distributor'
-]
\ No newline at end of file
+]
+
+# Rating levels in the Kaggle rating data
+rating_levels = [0.5, 1.0, 1.5, 2.0, 2.5, 3.0, 3.5, 4.0, 4.5, 5.0]
+
+# Compact column types for the Kaggle rating data
+ratings_dtypes = {
+    'userId': 'int32',
+    'movieId': 'int32',
+    'rating': ('category', rating_levels)
+}
+
+# Compact column types for the joined movie data
+movies_dtypes = {
+    'movie_id': 'int32',
+    'year': 'int16',
+    'country': 'category',
+    'language': 'category',
+    'status': 'category'
+}
+
+# Type of the aggregate rating counts joined into the movie data
+count_dtype = 'int32'
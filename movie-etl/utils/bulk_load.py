@@ -0,0 +1,402 @@
+import io
+import csv
+import time
+import queue
+import threading
+import datetime as dt
+from sqlalchemy import text
+from utils import profiling
+
+
+def quote(name):
+
+    """
+    Quote a table or column name so that its case is kept.
+
+    Parameters
+    ----------
+    name : str
+        Table or column name
+
+    Returns
+    -------
+    Str
+        Quoted name
+    """
+
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def create_table(chunk, table, engine, unlogged=False):
+
+    """
+    Create (or replace) an empty table with the same schema `to_sql()` would 
+    create for a chunk of data, index included.
+
+    Parameters
+    ----------
+    chunk : Pandas dataframe
+        Chunk of the data to be loaded
+    table : str
+        Name of table to create
+    engine : SQLAlchemy engine
+        Database engine
+    unlogged : bool, optional
+        Whether to make the table unlogged (PostgreSQL only), by default False
+    """
+
+    chunk.head(0).to_sql(table, engine, if_exists='replace')
+    if unlogged and engine.dialect.name == 'postgresql':
+        with engine.begin() as conn:
+            conn.execute(text(f'ALTER TABLE {quote(table)} SET UNLOGGED'))
+
+
+def copy_chunk(chunk, table, engine, dbapi_conn=None):
+
+    """
+    Bulk load a chunk of data into an existing table. On PostgreSQL, the chunk 
+    is streamed as CSV through `COPY ... FROM STDIN`. On other databases (e.g. 
+    a SQLite stand-in), the rows are inserted with a single `executemany()` on 
+    the raw connection.
+
+    Parameters
+    ----------
+    chunk : Pandas dataframe
+        Chunk of data to load, with its index loaded as the `index` column
+    table : str
+        Name of table to load into
+    engine : SQLAlchemy engine
+        Database engine
+    dbapi_conn : DBAPI connection, optional
+        Connection to load with, by default None. If None, a connection is 
+        checked out of the engine's pool for this chunk only.
+    """
+
+    columns = ['index'] + chunk.columns.tolist()
+    col_list = ', '.join(quote(col) for col in columns)
+
+    conn = dbapi_conn or engine.raw_connection()
+    try:
+        cursor = conn.cursor()
+
+        # Stream the chunk as CSV (empty fields are loaded as NULL)
+        if engine.dialect.name == 'postgresql':
+            buffer = io.StringIO()
+            chunk.to_csv(buffer, header=False, quoting=csv.QUOTE_MINIMAL)
+            buffer.seek(0)
+            cursor.copy_expert(f'COPY {quote(table)} ({col_list}) FROM STDIN WITH (FORMAT csv)', 
+                               buffer)
+
+        # Insert all rows at once
+        else:
+            marker = '?' if engine.dialect.paramstyle == 'qmark' else '%s'
+            params = ', '.join([marker] * len(columns))
+            rows = chunk.astype(object).where(chunk.notnull(), None).itertuples(name=None)
+            cursor.executemany(f'INSERT INTO {quote(table)} ({col_list}) VALUES ({params})', 
+                               rows)
+
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        if dbapi_conn is None:
+            conn.close()
+
+
+def write_chunk(chunk, table, conn, method='to_sql'):
+
+    """
+    Append a chunk of data to an existing table on a given connection.
+
+    Parameters
+    ----------
+    chunk : Pandas dataframe
+        Chunk of data to load
+    table : str
+        Name of table to load into
+    conn : SQLAlchemy connection
+        Connection to load with
+    method : str, optional
+        'to_sql' or 'copy' (see `copy_chunk()`), by default 'to_sql'
+    """
+
+    if method == 'copy':
+        copy_chunk(chunk, table, conn.engine, conn.connection)
+    else:
+        chunk.to_sql(table, conn, if_exists='append')
+
+
+class AdaptiveChunker:
+
+    """
+    Chunk size that adapts to the measured load throughput and memory use of 
+    the chunks loaded so far. After each chunk, the next size is set so that 
+    a chunk takes about `target_seconds` to load and/or takes up about 
+    `memory_budget` bytes in memory, whichever is smaller. Sizes change by at 
+    most `max_step`x per chunk and stay within [`min_size`, `max_size`].
+
+    Parameters
+    ----------
+    target_seconds : float, optional
+        Target time to load (commit) a chunk, by default None
+    memory_budget : int, optional
+        Target size of a chunk in memory in bytes, by default None
+    initial_size : int, optional
+        Number of rows of the first chunks, by default 100000
+    min_size : int, optional
+        Minimum number of rows per chunk, by default 1000
+    max_size : int, optional
+        Maximum number of rows per chunk, by default 5000000
+    max_step : float, optional
+        Maximum factor by which the size changes per chunk, by default 4.0
+    smoothing : float, optional
+        Weight of the latest chunk in the throughput and row size averages, 
+        by default 0.5
+    """
+
+    def __init__(self, target_seconds=None, memory_budget=None, initial_size=100000, 
+                 min_size=1000, max_size=5000000, max_step=4.0, smoothing=0.5):
+        self.target_seconds = target_seconds
+        self.memory_budget = memory_budget
+        self.size = initial_size
+        self.min_size, self.max_size = min_size, max_size
+        self.max_step, self.smoothing = max_step, smoothing
+        self.rows_per_sec = self.bytes_per_row = None
+        self.history = []
+        self._lock = threading.Lock()
+
+    def _average(self, average, value):
+        return value if average is None else self.smoothing * value + (1 - self.smoothing) * average
+
+    def observe(self, chunk, seconds):
+
+        """
+        Update the throughput and row size averages with a loaded chunk and 
+        set the size of the next chunks.
+
+        Parameters
+        ----------
+        chunk : Pandas dataframe
+            Chunk that was loaded
+        seconds : float
+            Time taken to load the chunk
+        """
+
+        rows = chunk.shape[0]
+        nbytes = chunk.memory_usage(index=True, deep=True).sum() if self.memory_budget else None
+        with self._lock:
+            if rows and seconds > 0:
+                self.rows_per_sec = self._average(self.rows_per_sec, rows / seconds)
+            if rows and nbytes:
+                self.bytes_per_row = self._average(self.bytes_per_row, nbytes / rows)
+
+            # Sizes that meet each target
+            targets = []
+            if self.target_seconds and self.rows_per_sec:
+                targets.append(self.target_seconds * self.rows_per_sec)
+            if self.memory_budget and self.bytes_per_row:
+                targets.append(self.memory_budget / self.bytes_per_row)
+
+            # Step toward the smallest target within the limits
+            if targets:
+                size = min(max(min(targets), self.size / self.max_step), self.size * self.max_step)
+                self.size = int(min(max(size, self.min_size), self.max_size))
+            self.history.append({'rows': rows, 'seconds': seconds, 'next_size': self.size})
+
+    def summary(self):
+
+        """
+        Summarize the tuned chunking parameters.
+
+        Returns
+        -------
+        Dict
+            Targets, final chunk size, average throughput and row size, and 
+            the size set after each chunk
+        """
+
+        return {'target_seconds': self.target_seconds, 'memory_budget': self.memory_budget, 
+                'chunksize': self.size, 'rows_per_sec': self.rows_per_sec, 
+                'bytes_per_row': self.bytes_per_row, 'history': self.history}
+
+
+def concurrent_load(chunks, table, engine, method='to_sql', n_workers=4, queue_size=None, 
+                    max_retries=3, backoff=1.0, unlogged=False, chunker=None):
+
+    """
+    Load chunks of data into a table with 1 reader thread and `n_workers` 
+    writer threads. The reader creates the table from the first chunk's 
+    schema, then puts chunks into a bounded queue, blocking while the queue is 
+    full so that parsing never runs far ahead of loading. Each writer checks 
+    out its own connection from the engine's pool, retries failed chunks with 
+    exponential backoff, and progress is printed in chunk order.
+
+    Parameters
+    ----------
+    chunks : iterable[Pandas dataframe]
+        Chunks of data to load, e.g. from `pd.read_csv(..., chunksize=...)`
+    table : str
+        Name of table to create and load into
+    engine : SQLAlchemy engine
+        Database engine with a pool of at least `n_workers` + 1 connections 
+        (1 per writer and 1 for the reader to create the table)
+    method : str, optional
+        'to_sql' or 'copy' (see `write_chunk()`), by default 'to_sql'
+    n_workers : int, optional
+        Number of writer threads, by default 4
+    queue_size : int, optional
+        Maximum number of parsed chunks waiting to be loaded, by default 
+        2x `n_workers`
+    max_retries : int, optional
+        Number of times to retry a failed chunk, by default 3
+    backoff : float, optional
+        Seconds to wait before the first retry (doubled for each retry after), 
+        by default 1.0
+    unlogged : bool, optional
+        Whether to create the table unlogged (PostgreSQL only), by default False
+    chunker : AdaptiveChunker, optional
+        Chunk sizer to update with each loaded chunk, by default None
+
+    Returns
+    -------
+    List[dict]
+        Rows loaded, seconds taken, rows per second, and retries of each 
+        chunk, in chunk order
+
+    Raises
+    ------
+    Exception
+        The first error raised by the reader or by a chunk that failed on 
+        every retry
+    """
+
+    chunk_queue = queue.Queue(maxsize=queue_size or 2 * n_workers)
+    stop = threading.Event() # set on the first unrecoverable error
+    lock = threading.Lock()
+    errors, stats = [], {}
+    next_report, start = 0, dt.datetime.now()
+    parent = profiling.current_path() # stage to record chunks under
+
+    # Helper function to print progress in chunk order
+    def report(i, chunk_stats):
+        nonlocal next_report
+        with lock:
+            stats[i] = chunk_stats
+            while next_report in stats:
+                s = stats[next_report]
+                print(f'Loaded rows {s["start_row"]:7} to {s["start_row"] + s["rows"]:7}', 
+                      f'{s["rows_per_sec"]:,.0f} rows/sec', 
+                      f'{dt.datetime.now() - start} elapsed', sep=' | ')
+                next_report += 1
+
+    # Helper function to put an item in the queue unless loading has stopped
+    def put(item):
+        while not stop.is_set():
+            try:
+                chunk_queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    # Reader: parse chunks into the queue
+    def read():
+        start_row = 0
+        try:
+            for i, chunk in enumerate(chunks):
+                if i == 0:
+                    create_table(chunk, table, engine, unlogged=unlogged)
+                put((i, start_row, chunk))
+                start_row += chunk.shape[0]
+                if stop.is_set():
+                    break
+        except Exception as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            for _ in range(n_workers): # 1 sentinel per writer
+                chunk_queue.put(None)
+
+    # Writer: load chunks from the queue on its own connection
+    def write():
+        try:
+            conn = engine.connect()
+        except Exception as e: # keep draining the queue without a connection
+            errors.append(e)
+            stop.set()
+            conn = None
+        try:
+            while True:
+                item = chunk_queue.get()
+                if item is None:
+                    return
+                if stop.is_set(): # drain the queue after an error
+                    continue
+                i, start_row, chunk = item
+                with profiling.stage(f'chunk_{i}', rows_in=chunk.shape[0], parent=parent) as rows:
+                    for retry in range(max_retries + 1):
+                        try:
+                            chunk_start = time.perf_counter()
+                            write_chunk(chunk, table, conn, method)
+                            seconds = time.perf_counter() - chunk_start
+                            if chunker is not None:
+                                chunker.observe(chunk, seconds)
+                            report(i, {'start_row': start_row, 'rows': chunk.shape[0], 
+                                       'seconds': seconds, 'retries': retry, 
+                                       'rows_per_sec': chunk.shape[0] / seconds if seconds else float('inf')})
+                            rows['rows_out'] = chunk.shape[0]
+                            break
+                        except Exception as e:
+                            if retry == max_retries or stop.is_set():
+                                errors.append(e)
+                                stop.set()
+                                break
+                            time.sleep(backoff * 2 ** retry)
+        finally:
+            if conn is not None:
+                conn.close()
+
+    # Run the reader and writers
+    threads = [threading.Thread(target=read)] + \
+              [threading.Thread(target=write) for _ in range(n_workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        raise errors[0]
+    return [stats[i] for i in sorted(stats)]
+
+
+def swap_tables(staging, table, engine):
+
+    """
+    Replace a table with a fully loaded staging table in a single transaction, 
+    so the table is left as it was if any step fails. On SQLite, the 
+    transaction is begun explicitly since pysqlite would otherwise commit each 
+    DDL statement on its own. On PostgreSQL, an unlogged staging table is made 
+    logged before the swap. 
+    The index `to_sql()` creates on the `index` column is rebuilt under the 
+    name of the replaced table so the next staging load can reuse its name.
+
+    Parameters
+    ----------
+    staging : str
+        Name of the staging table
+    table : str
+        Name of the table to replace
+    engine : SQLAlchemy engine
+        Database engine
+    """
+
+    with engine.begin() as conn:
+        if engine.dialect.name == 'sqlite':
+            conn.exec_driver_sql('BEGIN')
+        if engine.dialect.name == 'postgresql':
+            conn.execute(text(f'ALTER TABLE {quote(staging)} SET LOGGED'))
+        conn.execute(text(f'DROP INDEX IF EXISTS {quote(f"ix_{staging}_index")}'))
+        conn.execute(text(f'DROP TABLE IF EXISTS {quote(table)}'))
+        conn.execute(text(f'ALTER TABLE {quote(staging)} RENAME TO {quote(table)}'))
+        conn.execute(text(f'CREATE INDEX {quote(f"ix_{table}_index")} '
+                          f'ON {quote(table)} ({quote("index")})'))
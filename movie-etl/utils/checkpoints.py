@@ -0,0 +1,198 @@
+import os
+import glob
+import json
+import pickle
+import hashlib
+
+
+# Name of the file holding the key of each saved stage
+manifest_name = 'manifest.json'
+
+# Source files whose contents can change the output of the stages: the 
+# pipeline itself, `config.data_vars`, and every module in `utils`
+project_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+source_paths = [
+    os.path.join(project_dir, 'ETL.py'),
+    os.path.join(project_dir, 'config', 'data_vars.py'),
+    *sorted(glob.glob(os.path.join(project_dir, 'utils', '*.py')))
+]
+
+
+def file_hash(file_path, block_size=1 << 20):
+
+    """
+    Hash the contents of a file.
+
+    Parameters
+    ----------
+    file_path : str
+        Path to the file
+    block_size : int, optional
+        Number of bytes to read at a time, by default 1 MiB
+
+    Returns
+    -------
+    Str
+        SHA-256 hex digest of the file contents
+    """
+
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def stage_key(*parts):
+
+    """
+    Combine the hashes and settings a stage depends on into a single key.
+
+    Parameters
+    ----------
+    *parts : str
+        Input file hashes, upstream stage keys, or settings
+
+    Returns
+    -------
+    Str
+        SHA-256 hex digest of the parts
+    """
+
+    return hashlib.sha256('|'.join(map(str, parts)).encode()).hexdigest()
+
+
+def source_hash(paths=source_paths):
+
+    """
+    Hash the pipeline's source files (see `source_paths`) so that changes to 
+    the cleaning rules, file formats, schemas, or stages invalidate the saved 
+    stages.
+
+    Parameters
+    ----------
+    paths : list[str], optional
+        Paths to the source files, by default `source_paths`
+
+    Returns
+    -------
+    Str
+        Combined hash of the source files
+    """
+
+    return stage_key(*[file_hash(path) for path in paths])
+
+
+def read_manifest(checkpoint_dir):
+
+    """
+    Read the stage keys saved in a checkpoint directory.
+
+    Parameters
+    ----------
+    checkpoint_dir : str
+        Directory holding the saved stages
+
+    Returns
+    -------
+    Dict
+        Mapping of stage name to stage key
+    """
+
+    manifest_path = os.path.join(checkpoint_dir, manifest_name)
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, 'r') as f:
+        return json.load(f)
+
+
+def mark_done(checkpoint_dir, stage, key):
+
+    """
+    Record the key of a stage in the manifest of a checkpoint directory.
+
+    Parameters
+    ----------
+    checkpoint_dir : str
+        Directory holding the saved stages
+    stage : str
+        Name of the stage
+    key : str
+        Key of the stage's inputs
+    """
+
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    manifest = read_manifest(checkpoint_dir)
+    manifest[stage] = key
+
+    # Write to a temporary file first so an interrupted run can't corrupt it
+    manifest_path = os.path.join(checkpoint_dir, manifest_name)
+    with open(manifest_path + '.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(manifest_path + '.tmp', manifest_path)
+
+
+def is_done(checkpoint_dir, stage, key):
+
+    """
+    Check whether a stage was last run with the same inputs.
+
+    Parameters
+    ----------
+    checkpoint_dir : str
+        Directory holding the saved stages
+    stage : str
+        Name of the stage
+    key : str
+        Key of the stage's current inputs
+
+    Returns
+    -------
+    Bool
+        Whether the saved key of the stage matches `key`
+    """
+
+    return read_manifest(checkpoint_dir).get(stage) == key
+
+
+def cached(checkpoint_dir, stage, key, func, *args, **kwargs):
+
+    """
+    Return the saved output of a stage if its inputs are unchanged. Otherwise, 
+    run the stage, save its output, and record its key.
+
+    Parameters
+    ----------
+    checkpoint_dir : str
+        Directory holding the saved stages
+    stage : str
+        Name of the stage
+    key : str
+        Key of the stage's current inputs
+    func : callable
+        Function that runs the stage
+    *args, **kwargs
+        Arguments passed to `func`
+
+    Returns
+    -------
+    Any
+        Output of the stage
+    Bool
+        Whether the stage was run (False if its saved output was used)
+    """
+
+    output_path = os.path.join(checkpoint_dir, f'{stage}.pkl')
+
+    # Use the saved output
+    if is_done(checkpoint_dir, stage, key) and os.path.exists(output_path):
+        with open(output_path, 'rb') as f:
+            return pickle.load(f), False
+
+    # Run the stage and save its output
+    output = func(*args, **kwargs)
+    os.makedirs(checkpoint_dir, exist_ok=True)
+    with open(output_path, 'wb') as f:
+        pickle.dump(output, f, protocol=pickle.HIGHEST_PROTOCOL)
+    mark_done(checkpoint_dir, stage, key)
+    return output, True
@@ -0,0 +1,343 @@
+import os
+import re
+import json
+import pandas as pd
+from utils import schemas
+
+
+# File extensions of each supported format
+extensions = {
+    '.csv': 'csv',
+    '.parquet': 'parquet',
+    '.pq': 'parquet',
+    '.feather': 'feather',
+    '.arrow': 'feather',
+    '.pkl': 'pickle',
+    '.pickle': 'pickle'
+}
+
+
+def infer_format(file_path, file_format=None):
+
+    """
+    Get the format of a data file from its extension, unless given.
+
+    Parameters
+    ----------
+    file_path : str
+        Path to data file
+    file_format : str, optional
+        'csv', 'parquet', 'feather', or 'pickle', by default None. If None, the
+        format is inferred from the file extension, defaulting to 'csv'.
+
+    Returns
+    -------
+    Str
+        Format of the file
+
+    Raises
+    ------
+    ValueError
+        The format is not one of the supported formats
+    """
+
+    if file_format is None:
+        file_format = extensions.get(os.path.splitext(file_path)[1].lower(), 'csv')
+    if file_format not in set(extensions.values()):
+        raise ValueError('Invalid file format.')
+    return file_format
+
+
+def write_frame(df, file_path, file_format=None):
+
+    """
+    Write a dataframe (without its index) to a CSV, Parquet, Feather, or
+    pickle file. Parquet and Feather keep column types, including datetimes,
+    and require PyArrow.
+
+    Parameters
+    ----------
+    df : Pandas dataframe
+        Data to write
+    file_path : str
+        Path to data file
+    file_format : str, optional
+        Format of the file, by default inferred from its extension (see
+        `infer_format()`)
+    """
+
+    file_format = infer_format(file_path, file_format)
+    if file_format == 'csv':
+        df.to_csv(file_path, index=False)
+    elif file_format == 'parquet':
+        df.to_parquet(file_path, index=False)
+    elif file_format == 'feather':
+        df.reset_index(drop=True).to_feather(file_path)
+    else:
+        df.reset_index(drop=True).to_pickle(file_path)
+
+
+def read_frame(file_path, file_format=None, dtypes=None):
+
+    """
+    Read a dataframe from a CSV, Parquet, Feather, or pickle file.
+
+    Parameters
+    ----------
+    file_path : str
+        Path to data file
+    file_format : str, optional
+        Format of the file, by default inferred from its extension (see
+        `infer_format()`)
+    dtypes : dict, optional
+        Schema of compact column types (see `schemas.apply_schema()`), by
+        default None. CSV columns are parsed straight into these types.
+
+    Returns
+    -------
+    Pandas dataframe
+        Data in the file
+    """
+
+    file_format = infer_format(file_path, file_format)
+    if file_format == 'csv':
+        dtype = schemas.read_dtypes(dtypes) if dtypes else None
+        return pd.read_csv(file_path, low_memory=False, dtype=dtype)
+    elif file_format == 'parquet':
+        df = pd.read_parquet(file_path)
+    elif file_format == 'feather':
+        df = pd.read_feather(file_path)
+    else:
+        df = pd.read_pickle(file_path)
+    return schemas.apply_schema(df, dtypes) if dtypes else df
+
+
+class FrameWriter:
+
+    """
+    Write a dataframe to a file one chunk at a time, so that the full data is
+    never held in memory. CSV chunks are appended as text, Parquet chunks are
+    written as row groups, and Feather chunks as record batches. All chunks
+    must have the same columns and types. Pickle files can't be written in
+    chunks.
+
+    Parameters
+    ----------
+    file_path : str
+        Path to data file
+    file_format : str, optional
+        Format of the file, by default inferred from its extension (see
+        `infer_format()`)
+
+    Raises
+    ------
+    ValueError
+        The format is 'pickle'
+    """
+
+    def __init__(self, file_path, file_format=None):
+        self.file_path = file_path
+        self.file_format = infer_format(file_path, file_format)
+        if self.file_format == 'pickle':
+            raise ValueError('Pickle files can\'t be written in chunks.')
+        self._writer = None
+        self._n_chunks = 0
+
+    def write(self, chunk):
+
+        """
+        Write the next chunk of data.
+
+        Parameters
+        ----------
+        chunk : Pandas dataframe
+            Chunk of data to write (without its index)
+        """
+
+        if self.file_format == 'csv':
+            first = self._n_chunks == 0
+            chunk.to_csv(self.file_path, index=False, mode='w' if first else 'a', header=first)
+        else:
+            import pyarrow as pa
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if self._writer is None: # open file with the first chunk's schema
+                if self.file_format == 'parquet':
+                    import pyarrow.parquet as pq
+                    self._writer = pq.ParquetWriter(self.file_path, table.schema)
+                else:
+                    self._writer = pa.ipc.new_file(self.file_path, table.schema)
+            self._writer.write_table(table)
+        self._n_chunks += 1
+
+    def close(self):
+
+        """ Finish writing the file """
+
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def iter_chunks(file_path, chunksize, file_format=None, batch_size=65536):
+
+    """
+    Read a CSV, Parquet, Feather, or pickle file in chunks. Parquet files are
+    read `batch_size` rows at a time, while Feather and pickle files are read
+    in full and then split. Chunks keep a running index across the file, as
+    with `pd.read_csv(..., chunksize=...)`.
+
+    Parameters
+    ----------
+    file_path : str
+        Path to data file
+    chunksize : int or callable
+        Number of rows per chunk, or a function returning the number of rows
+        of the next chunk each time it's called (e.g. for adaptive sizing)
+    file_format : str, optional
+        Format of the file, by default inferred from its extension (see
+        `infer_format()`)
+    batch_size : int, optional
+        Number of rows read at a time from Parquet files, by default 65536
+
+    Yields
+    ------
+    Pandas dataframe
+        Next chunk of the data
+    """
+
+    next_size = chunksize if callable(chunksize) else lambda: chunksize
+    file_format = infer_format(file_path, file_format)
+
+    # Read CSV files with the parser's own chunking
+    if file_format == 'csv':
+        with pd.read_csv(file_path, iterator=True) as reader:
+            while True:
+                try:
+                    yield reader.get_chunk(next_size())
+                except StopIteration:
+                    return
+
+    import pyarrow as pa
+
+    # Source of record batches
+    if file_format == 'parquet':
+        import pyarrow.parquet as pq
+        batches = pq.ParquetFile(file_path).iter_batches(batch_size=batch_size)
+    elif file_format == 'feather':
+        import pyarrow.feather as feather
+        batches = feather.read_table(file_path).to_batches()
+    else:
+        batches = pa.Table.from_pandas(pd.read_pickle(file_path), preserve_index=False).to_batches()
+
+    # Regroup batches into chunks of the requested sizes
+    buffer, buffered, start_row = [], 0, 0
+    size = next_size()
+    for batch in batches:
+        buffer.append(batch)
+        buffered += batch.num_rows
+        while buffered >= size:
+            table = pa.Table.from_batches(buffer)
+            chunk = table.slice(0, size).to_pandas()
+            chunk.index = pd.RangeIndex(start_row, start_row + size)
+            yield chunk
+            start_row += size
+            buffer, buffered = table.slice(size).to_batches(), buffered - size
+            size = next_size()
+    if buffered: # last partial chunk
+        chunk = pa.Table.from_batches(buffer).to_pandas()
+        chunk.index = pd.RangeIndex(start_row, start_row + buffered)
+        yield chunk
+
+
+# Whitespace between JSON values, and characters that can continue a number
+json_space = re.compile(r'\s*')
+number_chars = set('0123456789.eE+-')
+
+
+def iter_json(file_path, block_size=2 ** 20):
+
+    """
+    Read the records of a JSON array file, or of a newline-delimited JSON 
+    file, one at a time. The file is read `block_size` characters at a time 
+    and each record is parsed as soon as it's complete, so only the records 
+    kept by the caller stay in memory, instead of the whole file as with 
+    `json.load()`.
+
+    Parameters
+    ----------
+    file_path : str
+        Path to a JSON file holding an array of records, or holding 1 record 
+        per line
+    block_size : int, optional
+        Number of characters read from the file at a time, by default 2 ** 20
+
+    Yields
+    ------
+    Dict
+        Next record in the file
+
+    Raises
+    ------
+    ValueError
+        The file is not a JSON array or newline-delimited JSON
+    """
+
+    decoder = json.JSONDecoder()
+    with open(file_path, 'r', encoding='utf-8') as f:
+        buffer, pos, eof = '', 0, False
+
+        def skip_space(): # move to the next value, reading more if needed
+            nonlocal buffer, pos, eof
+            while True:
+                pos = json_space.match(buffer, pos).end()
+                if pos < len(buffer) or eof:
+                    return
+                block = f.read(block_size)
+                eof = not block
+                buffer, pos = buffer[pos:] + block, 0
+
+        # A JSON array or newline-delimited records
+        skip_space()
+        is_array = buffer.startswith('[', pos)
+        if is_array:
+            pos += 1
+            skip_space()
+            if buffer.startswith(']', pos):
+                return
+
+        while pos < len(buffer):
+
+            # Parse the next record, reading more until it's complete (a number 
+            # is only complete once the character after it is read)
+            try:
+                record, end = decoder.raw_decode(buffer, pos)
+                complete = eof or (end < len(buffer) and buffer[end] not in number_chars)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                complete = False
+            if not complete:
+                block = f.read(block_size)
+                eof = not block
+                buffer, pos = buffer[pos:] + block, 0
+                continue
+            yield record
+            pos = end
+
+            # Move past the separator
+            skip_space()
+            if is_array:
+                if buffer.startswith(']', pos):
+                    return
+                if not buffer.startswith(',', pos):
+                    raise ValueError('Invalid JSON array.')
+                pos += 1
+                skip_space()
+        if is_array:
+            raise ValueError('Invalid JSON array.')
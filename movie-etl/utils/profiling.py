@@ -0,0 +1,390 @@
+import os
+import sys
+import json
+import time
+import inspect
+import cProfile
+import functools
+import threading
+import datetime as dt
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError: # not available on Windows
+    resource = None
+
+
+def peak_rss_mb():
+
+    """
+    Get the peak resident set size (high-water mark of physical memory used)
+    of this process so far.
+
+    Returns
+    -------
+    Float or None
+        Peak RSS in MiB, or None if it can't be measured on this platform
+    """
+
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10 # bytes on macOS, KiB elsewhere
+
+
+class RunReport:
+
+    """
+    Record the metrics of each stage of a pipeline run: wall time, CPU time,
+    peak RSS, rows in and out, and rows per second. Stages can be nested, and
+    are named by their path of enclosing stages (e.g.
+    'transform/clean_wiki_movies/recast_wiki_columns/release_date'). Stages
+    run in other threads are nested under the given `parent` stage.
+
+    Parameters
+    ----------
+    profile_dir : str, optional
+        Directory to save a profile of each stage to, by default None (no
+        profiling)
+    profiler : str, optional
+        'cprofile' (a `.prof` file for `pstats`/snakeviz) or 'pyinstrument'
+        (an `.html` file, requires pyinstrument), by default 'cprofile'
+    profile_depth : int, optional
+        Number of levels of stages to profile, by default 1 (only top-level
+        stages). Stages within a profiled stage, or run in other threads, are
+        not profiled separately.
+    """
+
+    def __init__(self, profile_dir=None, profiler='cprofile', profile_depth=1):
+        self.profile_dir = profile_dir
+        self.profiler = profiler
+        self.profile_depth = profile_depth
+        self.pid = os.getpid()
+        self.started = dt.datetime.now()
+        self.start = time.perf_counter()
+        self.stages = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._profiling = False
+        if profile_dir:
+            os.makedirs(profile_dir, exist_ok=True)
+
+    def path(self):
+
+        """ Path of the stages being run in this thread """
+
+        return '/'.join(getattr(self._local, 'stack', []))
+
+    def _start_profiler(self):
+        if self.profiler == 'pyinstrument':
+            from pyinstrument import Profiler
+            profiler = Profiler()
+            profiler.start()
+        else:
+            profiler = cProfile.Profile()
+            profiler.enable()
+        return profiler
+
+    def _save_profile(self, profiler, name):
+        file_name = name.replace('/', '.')
+        if self.profiler == 'pyinstrument':
+            profiler.stop()
+            file_path = os.path.join(self.profile_dir, f'{file_name}.html')
+            with open(file_path, 'w') as f:
+                f.write(profiler.output_html())
+        else:
+            profiler.disable()
+            file_path = os.path.join(self.profile_dir, f'{file_name}.prof')
+            profiler.dump_stats(file_path)
+        return file_path
+
+    @contextmanager
+    def stage(self, name, rows_in=None, parent=None):
+
+        """
+        Measure a stage of the run. The yielded dictionary can be updated with
+        `rows_in` and `rows_out` while the stage runs.
+
+        Parameters
+        ----------
+        name : str
+            Name of the stage
+        rows_in : int, optional
+            Number of rows into the stage, by default None
+        parent : str, optional
+            Path of the enclosing stage for stages run in another thread, by
+            default None (the stages being run in this thread)
+
+        Yields
+        ------
+        Dict
+            Row counts of the stage
+        """
+
+        # Stage path
+        stack = self._local.__dict__.setdefault('stack', [])
+        if parent is None:
+            parent = self.path()
+        path = f'{parent}/{name}' if parent else name
+        stack.append(name)
+
+        # Only profile the outer stages of the main thread, 1 at a time
+        main_thread = threading.current_thread() is threading.main_thread()
+        profiler = None
+        with self._lock:
+            if self.profile_dir and main_thread and not self._profiling and \
+                    path.count('/') < self.profile_depth:
+                self._profiling = True
+                profiler = self._start_profiler()
+
+        # Run the stage
+        rows = {'rows_in': rows_in, 'rows_out': None}
+        cpu_time = time.process_time if main_thread else time.thread_time
+        rss_start, cpu_start, start = peak_rss_mb(), cpu_time(), time.perf_counter()
+        error = None
+        try:
+            yield rows
+        except BaseException as e:
+            error = repr(e)
+            raise
+        finally:
+            wall, cpu = time.perf_counter() - start, cpu_time() - cpu_start
+            stack.pop()
+
+            # Stage metrics
+            rss = peak_rss_mb()
+            n_rows = rows['rows_out'] if rows['rows_out'] is not None else rows['rows_in']
+            record = {'stage': path, 'offset_seconds': start - self.start,
+                      'wall_seconds': wall, 'cpu_seconds': cpu,
+                      'peak_rss_mb': rss, 'rss_growth_mb': rss - rss_start if rss is not None else None,
+                      'rows_in': rows['rows_in'], 'rows_out': rows['rows_out'],
+                      'rows_per_sec': n_rows / wall if n_rows is not None and wall else None}
+            if profiler is not None:
+                record['profile'] = self._save_profile(profiler, path)
+                with self._lock:
+                    self._profiling = False
+            if error:
+                record['error'] = error
+            with self._lock:
+                self.stages.append(record)
+
+    def to_dict(self):
+
+        """
+        Get the run report.
+
+        Returns
+        -------
+        Dict
+            Start time, total wall time, peak RSS, and metrics of each stage in
+            order of completion
+        """
+
+        return {'started': self.started.isoformat(),
+                'wall_seconds': time.perf_counter() - self.start,
+                'peak_rss_mb': peak_rss_mb(),
+                'python': sys.version.split()[0],
+                'stages': list(self.stages)}
+
+    def save(self, file_path):
+
+        """
+        Save the run report to a JSON file.
+
+        Parameters
+        ----------
+        file_path : str
+            Path to JSON file
+        """
+
+        with open(file_path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2, default=str)
+
+
+# Run report that stages are recorded in, if any
+active_report = None
+
+
+def start_run(profile_dir=None, profiler='cprofile', profile_depth=1):
+
+    """
+    Start recording the stages of a pipeline run (see `RunReport`).
+
+    Returns
+    -------
+    RunReport
+        Report that stages are recorded in until `end_run()`
+    """
+
+    global active_report
+    active_report = RunReport(profile_dir, profiler, profile_depth)
+    return active_report
+
+
+def end_run(file_path=None):
+
+    """
+    Stop recording the stages of a pipeline run and optionally save the run
+    report.
+
+    Parameters
+    ----------
+    file_path : str, optional
+        Path to save the JSON run report to, by default None
+
+    Returns
+    -------
+    RunReport or None
+        Report of the run, or None if no run was started
+    """
+
+    global active_report
+    report, active_report = active_report, None
+    if report is not None and file_path:
+        report.save(file_path)
+    return report
+
+
+def current_path():
+
+    """ Path of the stages being run in this thread, to pass as `parent` to stages run in other threads """
+
+    return active_report.path() if active_report is not None else ''
+
+
+@contextmanager
+def run(file_path=None, profile_dir=None, profiler='cprofile', profile_depth=1):
+
+    """
+    Record the stages run within this context and save the run report, even 
+    if a stage fails. Does nothing if `file_path` is None.
+
+    Parameters
+    ----------
+    file_path : str, optional
+        Path to save the JSON run report to, by default None
+    profile_dir : str, optional
+        Directory to save a profile of each stage to, by default None (see 
+        `RunReport`)
+    profiler : str, optional
+        'cprofile' or 'pyinstrument', by default 'cprofile'
+    profile_depth : int, optional
+        Number of levels of stages to profile, by default 1
+
+    Yields
+    ------
+    RunReport or None
+        Report that stages are recorded in
+    """
+
+    if file_path is None:
+        yield None
+        return
+    report = start_run(profile_dir, profiler, profile_depth)
+    try:
+        yield report
+    finally:
+        end_run(file_path)
+
+
+@contextmanager
+def stage(name, rows_in=None, parent=None):
+
+    """
+    Measure a stage in the active run report (see `RunReport.stage()`). Does
+    nothing if no run was started with `start_run()`, or in worker processes
+    forked during the run.
+
+    Parameters
+    ----------
+    name : str
+        Name of the stage
+    rows_in : int, optional
+        Number of rows into the stage, by default None
+    parent : str, optional
+        Path of the enclosing stage for stages run in another thread, by
+        default None
+
+    Yields
+    ------
+    Dict
+        Row counts of the stage, which can be updated with `rows_in` and
+        `rows_out`
+    """
+
+    report = active_report
+    if report is None or report.pid != os.getpid():
+        yield {'rows_in': rows_in, 'rows_out': None}
+    else:
+        with report.stage(name, rows_in, parent) as rows:
+            yield rows
+
+
+def count_rows(obj):
+
+    """
+    Count the rows of a dataframe, series, array, or list, or of the first 
+    item of a tuple (e.g. a function's first return value).
+
+    Returns
+    -------
+    Int or None
+        Number of rows, or None if `obj` has no rows to count (e.g. a path)
+    """
+
+    if isinstance(obj, tuple):
+        obj = obj[0] if obj else None
+    if hasattr(obj, 'shape'):
+        return obj.shape[0]
+    if isinstance(obj, list):
+        return len(obj)
+    return None
+
+
+def staged(name, rows_out=count_rows):
+
+    """
+    Decorator measuring each call of a function as a stage in the active run 
+    report (see `stage()`), with rows in counted from the function's first 
+    argument and rows out from its return value (see `count_rows()`). Calls 
+    the function directly if no run was started.
+
+    Parameters
+    ----------
+    name : str
+        Name of the stage, which can refer to the function's arguments as 
+        format fields (e.g. 'load_{table}')
+    rows_out : function, optional
+        Function counting the rows out from the return value, by default 
+        `count_rows()`
+
+    Returns
+    -------
+    Function
+        Decorator
+    """
+
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if active_report is None:
+                return func(*args, **kwargs)
+
+            # Stage name with any arguments filled in
+            stage_name = name
+            if '{' in name:
+                arguments = signature.bind(*args, **kwargs)
+                arguments.apply_defaults()
+                stage_name = name.format(**arguments.arguments)
+
+            with stage(stage_name, rows_in=count_rows(args[0]) if args else None) as rows:
+                result = func(*args, **kwargs)
+                rows['rows_out'] = rows_out(result)
+            return result
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,112 @@
+import pandas as pd
+
+
+def to_dtype(dtype):
+
+    """
+    Convert a schema entry to a Pandas type. Categorical types with fixed 
+    categories are given as ('category', [categories]).
+
+    Parameters
+    ----------
+    dtype : str or tuple(str, list)
+        Schema entry
+
+    Returns
+    -------
+    Str or Pandas CategoricalDtype
+        Type to cast to
+    """
+
+    if isinstance(dtype, tuple):
+        return pd.CategoricalDtype(dtype[1])
+    return dtype
+
+
+def read_dtypes(schema):
+
+    """
+    Convert a schema to the `dtype` argument of `pd.read_csv()`, so columns 
+    are parsed straight into their compact types.
+
+    Parameters
+    ----------
+    schema : dict
+        Mapping of column name to schema entry (see `to_dtype()`)
+
+    Returns
+    -------
+    Dict
+        Mapping of column name to Pandas type
+    """
+
+    return {col: to_dtype(dtype) for col, dtype in schema.items()}
+
+
+def apply_schema(df, schema):
+
+    """
+    Cast the columns of a dataframe that are in a schema to their compact 
+    types. Columns holding lists are left as objects for categorical types 
+    since lists can't be categories, and integer types are only applied to 
+    columns without missing values.
+
+    Parameters
+    ----------
+    df : Pandas dataframe
+        Data to cast
+    schema : dict
+        Mapping of column name to schema entry (see `to_dtype()`)
+
+    Returns
+    -------
+    Pandas dataframe
+        Data with compact column types
+    """
+
+    for col, dtype in read_dtypes(schema).items():
+        if col not in df.columns:
+            continue
+        values = df[col]
+        if dtype == 'category' and values.map(lambda v: isinstance(v, list)).any():
+            continue
+        if isinstance(dtype, str) and dtype.startswith('int') and values.isnull().any():
+            continue
+        df[col] = values.astype(dtype)
+    return df
+
+
+def memory_usage(df):
+
+    """
+    Get the memory used by a dataframe, including the contents of object 
+    columns.
+
+    Parameters
+    ----------
+    df : Pandas dataframe
+        Data to measure
+
+    Returns
+    -------
+    Int
+        Memory used in bytes
+    """
+
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def print_memory_report(report):
+
+    """
+    Print the memory used by the data at each stage.
+
+    Parameters
+    ----------
+    report : dict
+        Mapping of stage name to memory used in bytes
+    """
+
+    for stage, nbytes in report.items():
+        print(f'{stage:>10}: {nbytes / 2 ** 20:10,.1f} MiB')
+    print(f'{"total":>10}: {sum(report.values()) / 2 ** 20:10,.1f} MiB')
@@ -1,6 +1,6 @@
 import numpy as np
 import pandas as pd
-from utils import udf_movies
+from utils import udf_movies, profiling
 
 
 def drop_cols(movies_df):
@@ -59,6 +59,7 @@ def recast_cols(movies_df):
     return movies_df
 
 
+@profiling.staged('clean_kaggle_movies')
 def clean_kaggle_movies(movies_df):
 
     """
@@ -1,14 +1,65 @@
+import re
 import numpy as np
 import pandas as pd
+from utils import profiling
 from config.data_vars import col_order, col_names
 
 
+# IMDb ids ("tt" and 7 or 8 digits) in ids and links
+imdb_id_pattern = re.compile(r'tt(\d{7,8})(?!\d)')
+
+
+def parse_imdb_id(values):
+
+    """
+    Parse IMDb ids (e.g. "tt0012345" or "tt12345678") from ids or links into 
+    integer keys.
+
+    Parameters
+    ----------
+    values : Pandas series[obj]
+        IMDb ids or links
+
+    Returns
+    -------
+    Pandas series[int64]
+        IMDb ids as integers, with -1 for values without an IMDb id
+    """
+
+    # Already parsed
+    if pd.api.types.is_integer_dtype(values):
+        return values.astype(np.int64)
+
+    digits = values.astype(object).str.extract(imdb_id_pattern, expand=False)
+    return pd.to_numeric(digits).fillna(-1).astype(np.int64)
+
+
+def format_imdb_id(keys):
+
+    """
+    Convert integer IMDb id keys from `parse_imdb_id()` back to IMDb ids.
+
+    Parameters
+    ----------
+    keys : Pandas series[int64]
+        IMDb ids as integers
+
+    Returns
+    -------
+    Pandas series[obj]
+        IMDb ids with at least 7 digits (e.g. "tt0012345")
+    """
+
+    return pd.Series([f'tt{key:07d}' for key in keys.tolist()], index=keys.index, dtype=object)
+
+
 def drop_duplicates(movies_df):
 
     """
-    Drop duplicate rows based on `imdb_id`. If `imdb_id` is not in the columns, 
-    create it from `imdb_link`. Additionally, drop any movies with an `imdb_id` 
-    of 0.
+    Parse `imdb_id` into an integer key and drop duplicate rows based on it. 
+    If `imdb_id` is not in the columns, create it from `imdb_link`. 
+    Additionally, drop any movies without an IMDb id (including an `imdb_id` 
+    of 0).
 
     Parameters
     ----------
@@ -18,18 +69,17 @@ def drop_duplicates(movies_df):
     Returns
     -------
     Pandas dataframe
-        Data with duplicate rows dropped
+        Data with duplicate rows dropped and `imdb_id` as int64
     """
 
-    # Extract `imdb_id` into a new column if not already present
-    if 'imdb_id' not in movies_df.columns and 'imdb_link' in movies_df.columns:
-        movies_df['imdb_id'] = movies_df['imdb_link'].str.extract(r'(tt\d{7})')
-
-    # Drop movies with an `imdb_id` of 0
-    movies_df = movies_df.query('imdb_id != "0"').copy()
+    # Parse `imdb_id` (or else `imdb_link`) into an integer key
+    source = 'imdb_id' if 'imdb_id' in movies_df.columns else 'imdb_link'
+    keys = parse_imdb_id(movies_df[source])
 
-    # Drop duplicate rows
-    movies_df.drop_duplicates(subset=['imdb_id'], inplace=True)
+    # Drop movies without an IMDb id and duplicate rows
+    keep = ((keys >= 0) & ~keys.duplicated()).values
+    movies_df = movies_df[keep].copy()
+    movies_df['imdb_id'] = keys.values[keep]
     return movies_df
 
 
@@ -66,6 +116,39 @@ def filla_dropb(cola, colb, movies_df):
     return movies_df
 
 
+def fill_and_drop(movies_df, redundant_pairs):
+
+    """
+    Vectorized version of `filla_dropb()` over several pairs of columns at 
+    once. For each pair, missing or 0 values in column a (keep) are filled 
+    with the non-missing, non-zero values in column b (drop), then all of the 
+    b columns are dropped from the joined movie data in a single call.
+
+    Parameters
+    ----------
+    movies_df : Pandas dataframe
+        Joined movie data
+    redundant_pairs : list[list[str]]
+        Pairs of column names, each as [column a (keep), column b (drop)]
+
+    Returns
+    -------
+    Pandas dataframe
+        Movie data with missing values of each column a filled and each 
+        column b dropped
+    """
+
+    # Fill each `cola` where it is 0 or missing and `colb` has a value
+    for cola, colb in redundant_pairs:
+        a, b = movies_df[cola], movies_df[colb]
+        fill = (a.isnull() | (a == 0)) & (b.notnull() & (b != 0))
+        movies_df[cola] = a.where(~fill, b)
+
+    # Drop all `colb` columns
+    movies_df.drop([colb for _, colb in redundant_pairs], axis=1, inplace=True)
+    return movies_df
+
+
 def drop_redundant_cols(movies_df):
 
     """
@@ -100,8 +183,7 @@ def drop_redundant_cols(movies_df):
     ]
 
     # Fill the first column and drop the second column for each pair
-    for a, b in redundant_pairs:
-        movies_df = filla_dropb(a, b, movies_df)
+    movies_df = fill_and_drop(movies_df, redundant_pairs)
     return movies_df
 
 
@@ -136,11 +218,13 @@ def clean_cols(movies_df, col_order=col_order, col_names=col_names):
     return movies_df
 
 
+@profiling.staged('join_movie_data')
 def join_movie_data(wiki_df, kaggle_df):
 
     """
-    Join the Wikipedia movie data and Kaggle movie data. Clean the columns by 
-    dropping redundant columns and renaming remaining columns for consistency.
+    Join the Wikipedia movie data and Kaggle movie data on their integer IMDb 
+    ids. Clean the columns by dropping redundant columns and renaming 
+    remaining columns for consistency.
 
     Parameters
     ----------
@@ -155,12 +239,17 @@ def join_movie_data(wiki_df, kaggle_df):
         Joined movie data
     """
 
-    # Join Wikipedia and Kaggle data
+    # Join Wikipedia and Kaggle data on integer IMDb ids
+    if not pd.api.types.is_integer_dtype(wiki_df['imdb_id']):
+        wiki_df = wiki_df.assign(imdb_id=parse_imdb_id(wiki_df['imdb_id']))
+    if not pd.api.types.is_integer_dtype(kaggle_df['imdb_id']):
+        kaggle_df = kaggle_df.assign(imdb_id=parse_imdb_id(kaggle_df['imdb_id']))
     movies_df = pd.merge(wiki_df, kaggle_df, how='inner', 
                          on='imdb_id', suffixes=['_wiki', '_kaggle'])
 
     # Clean columns
     movies_df = drop_redundant_cols(movies_df) # drop redundant columns
     movies_df = clean_cols(movies_df) # rename and reorder columns
+    movies_df['imdb_id'] = format_imdb_id(movies_df['imdb_id']) # IMDb ids as strings
 
     return movies_df
\ No newline at end of file
@@ -1,12 +1,15 @@
 import numpy as np
 import pandas as pd
+from utils import formats, schemas, profiling
 
 
-def reduce_ratings(ratings_df, movie_id, save_path):
+@profiling.staged('reduce_ratings')
+def reduce_ratings(ratings_df, movie_id, save_path, file_format=None):
 
     """
     Convert `timestamp` to datetime and reduce the rating data to only the 
-    movies in the movie data. Save this reduced rating data to a CSV file.
+    movies in the movie data. Save this reduced rating data to a CSV, Parquet, 
+    or Feather file.
 
     Parameters
     ----------
@@ -16,6 +19,9 @@ def reduce_ratings(ratings_df, movie_id, save_path):
         List of `id`s in the movie data
     save_path : str
         Path to save the reduced rating data
+    file_format : str, optional
+        Format of the saved file, by default inferred from the extension of 
+        `save_path` (see `formats.infer_format()`)
 
     Returns
     -------
@@ -30,41 +36,414 @@ def reduce_ratings(ratings_df, movie_id, save_path):
     reduced_df = ratings_df[ratings_df['movieId'].isin(movie_id)]
 
     # Save reduced rating data
-    reduced_df.to_csv(save_path, index=False)
+    formats.write_frame(reduced_df, save_path, file_format)
     return reduced_df
 
 
-def join_data(movies_df, ratings_df):
+def reduce_ratings_chunked(ratings_path, movie_id, save_path, chunksize=1000000, 
+                           file_format=None, dtypes=None, return_stats=False):
 
     """
-    Aggregate rating counts for each movie and merge the aggregate rating data 
-    into the movie data.
+    Stream the rating data from a file in chunks. Each chunk has its 
+    `timestamp` converted to datetime and is reduced to only the movies in the 
+    movie data before being appended to a CSV, Parquet, or Feather file. 
+    Rating counts by movie (and optionally rating statistics) are accumulated 
+    along the way so the full rating data is never held in memory.
+
+    Parameters
+    ----------
+    ratings_path : str
+        Path to the Kaggle ratings data
+    movie_id : array-like[int]
+        List of `id`s in the movie data
+    save_path : str
+        Path to save the reduced rating data
+    chunksize : int, optional
+        Number of rows to read per chunk, by default 1000000
+    file_format : str, optional
+        Format of the saved file, by default inferred from the extension of 
+        `save_path` (see `formats.infer_format()`)
+    dtypes : dict, optional
+        Schema of compact column types to cast each chunk to (e.g. 
+        `ratings_dtypes` from the `config.data_vars` module), by default None
+    return_stats : bool, optional
+        Whether to also return rating statistics by movie, accumulated in the 
+        same pass, by default False
+
+    Returns
+    -------
+    Pandas dataframe
+        Rating counts by movie (see `count_ratings()`)
+    Int
+        Number of rows in the reduced rating data
+    Pandas dataframe
+        Rating statistics by movie (see `rating_stats()`), only returned if 
+        `return_stats` is True
+    """
+
+    # Movie ids to keep
+    movie_id = pd.Index(pd.unique(np.asarray(movie_id)))
+    movies = np.sort(movie_id.values) # rows of the rating counts
+
+    # Read the rating data in chunks
+    counts, stats, n_ratings = None, None, 0
+    with profiling.stage('reduce_ratings', rows_in=0) as rows, \
+            formats.FrameWriter(save_path, file_format) as writer:
+        for chunk in formats.iter_chunks(ratings_path, chunksize):
+            rows['rows_in'] += chunk.shape[0]
+
+            # Convert timestamp to datetime and filter the chunk
+            chunk['rating'] = chunk['rating'].astype(float)
+            if dtypes:
+                chunk = schemas.apply_schema(chunk, dtypes)
+            chunk['timestamp'] = pd.to_datetime(chunk['timestamp'], unit='s')
+            chunk = chunk[chunk['movieId'].isin(movie_id)]
+
+            # Append reduced chunk to the saved file
+            writer.write(chunk)
+            n_ratings += chunk.shape[0]
+
+            # Accumulate rating counts by movie and rating
+            chunk_counts = rating_histogram(chunk['movieId'], chunk['rating'], movies)
+            counts = chunk_counts if counts is None else add_histograms(counts, chunk_counts)
+
+            # Accumulate rating statistics by movie
+            if return_stats:
+                chunk_stats = rating_stats(chunk['movieId'], chunk['rating'], chunk['timestamp'], movies)
+                stats = chunk_stats if stats is None else merge_stats(stats, chunk_stats)
+        rows['rows_out'] = n_ratings
+
+    # Only keep movies that were rated
+    counts = counts[counts.values.any(axis=1)]
+    if return_stats:
+        return counts, n_ratings, stats[stats['n'] > 0]
+    return counts, n_ratings
+
+
+def rating_histogram(movie_ids, ratings, movies=None, levels=None):
+
+    """
+    Count the number of times each movie got each rating. Each rating is 
+    mapped to the bin of its level and each movie to its row, and the counts 
+    of all (row, bin) pairs are taken in a single pass with `np.bincount()`.
+    Ratings that are missing or not one of the levels aren't counted.
+
+    Parameters
+    ----------
+    movie_ids : array-like[int]
+        Movie id of each rating
+    ratings : array-like[float] or Pandas categorical series
+        Rating values
+    movies : array-like[int], optional
+        Sorted unique movie ids to count ratings for, by default None. If 
+        None, these are the movie ids in `movie_ids`. Ratings of any other 
+        movie aren't counted.
+    levels : array-like[float], optional
+        Rating levels to count, by default None. If None, these are the 
+        categories of categorical ratings, or else the unique rating values.
+
+    Returns
+    -------
+    Pandas dataframe
+        Dense int32 rating counts with `movieId` as the index and one column 
+        per rating level that was given at least once
+    """
+
+    movie_ids = np.asarray(movie_ids)
+
+    # Map ratings to bins (missing and unknown ratings are -1)
+    if isinstance(ratings.dtype, pd.CategoricalDtype) and levels is None:
+        levels = ratings.cat.categories.values
+        bins = ratings.cat.codes.values
+    elif levels is None:
+        bins, levels = pd.factorize(np.asarray(ratings, dtype=float), sort=True)
+    else:
+        levels = np.sort(np.asarray(levels, dtype=float))
+        bins = pd.Index(levels).get_indexer(np.asarray(ratings, dtype=float))
+
+    # Map movies to rows (unknown movies are -1)
+    if movies is None:
+        rows, movies = pd.factorize(movie_ids, sort=True)
+    else:
+        movies = np.asarray(movies)
+        rows = pd.Index(movies).get_indexer(movie_ids)
+
+    # Count each (row, bin) pair
+    n_levels = len(levels)
+    flat = rows.astype(np.int64) * n_levels + bins
+    valid = (rows >= 0) & (bins >= 0)
+    if not valid.all():
+        flat = flat[valid]
+    counts = np.bincount(flat, minlength=len(movies) * n_levels)
+    counts = counts.astype(np.int32).reshape(len(movies), n_levels)
+
+    # Only keep levels that were given
+    given = counts.any(axis=0)
+    return pd.DataFrame(counts[:, given], 
+                        index=pd.Index(movies, name='movieId'), 
+                        columns=pd.Index(np.asarray(levels)[given], name='rating'))
+
+
+def add_histograms(a, b):
+
+    """
+    Add up 2 sets of rating counts from `rating_histogram()`, which may have 
+    different movies and rating levels.
+
+    Parameters
+    ----------
+    a : Pandas dataframe
+        Rating counts
+    b : Pandas dataframe
+        Rating counts
+
+    Returns
+    -------
+    Pandas dataframe
+        Total rating counts, with columns in order of rating level
+    """
+
+    if a.index.equals(b.index) and a.columns.equals(b.columns):
+        return a + b
+    total = a.add(b, fill_value=0).fillna(0).astype(np.int32)
+    return total.sort_index(axis=1)
+
+
+def rating_stats(movie_ids, ratings, timestamps, movies=None):
+
+    """
+    Compute mergeable rating statistics for each movie: the number of 
+    ratings, their mean, their sum of squared deviations from the mean (for 
+    the variance), and the first and last rating times. Statistics of 
+    separate chunks or shards of the rating data can be combined with 
+    `merge_stats()` and turned into movie columns with `join_stats()`.
+
+    Parameters
+    ----------
+    movie_ids : array-like[int]
+        Movie id of each rating
+    ratings : array-like[float] or Pandas categorical series
+        Rating values
+    timestamps : Pandas series
+        Datetime of each rating
+    movies : array-like[int], optional
+        Sorted unique movie ids to compute statistics for, by default None. If 
+        None, these are the movie ids in `movie_ids`. Ratings of any other 
+        movie are ignored.
+
+    Returns
+    -------
+    Pandas dataframe
+        Columns `n`, `mean`, `m2`, `first`, and `last` with `movieId` as the 
+        index. Movies without ratings have a `mean` of NaN and `first` and 
+        `last` of NaT.
+    """
+
+    movie_ids = np.asarray(movie_ids)
+    ratings = np.asarray(ratings, dtype=float)
+    times = pd.to_datetime(timestamps).values.astype('datetime64[ns]').view(np.int64)
+
+    # Map movies to rows
+    if movies is None:
+        rows, movies = pd.factorize(movie_ids, sort=True)
+    else:
+        movies = np.asarray(movies)
+        rows = pd.Index(movies).get_indexer(movie_ids)
+
+    # Only keep known movies and non-missing ratings
+    valid = (rows >= 0) & ~np.isnan(ratings)
+    if not valid.all():
+        rows, ratings, times = rows[valid], ratings[valid], times[valid]
+
+    # Count, mean, and sum of squared deviations
+    n_movies = len(movies)
+    n = np.bincount(rows, minlength=n_movies)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.bincount(rows, weights=ratings, minlength=n_movies) / n
+    m2 = np.bincount(rows, weights=(ratings - mean[rows]) ** 2, minlength=n_movies)
+
+    # First and last rating times
+    first = np.full(n_movies, np.iinfo(np.int64).max)
+    last = np.full(n_movies, np.iinfo(np.int64).min)
+    np.minimum.at(first, rows, times)
+    np.maximum.at(last, rows, times)
+    first[n == 0] = last[n == 0] = np.datetime64('NaT').view(np.int64)
+
+    return pd.DataFrame({'n': n, 'mean': mean, 'm2': m2, 
+                         'first': first.view('datetime64[ns]'), 
+                         'last': last.view('datetime64[ns]')}, 
+                        index=pd.Index(movies, name='movieId'))
+
+
+def merge_stats(a, b):
+
+    """
+    Combine 2 sets of rating statistics from `rating_stats()`, which may have 
+    different movies. Means and sums of squared deviations are combined with 
+    the pairwise update of Chan et al., so no rating is read again.
+
+    Parameters
+    ----------
+    a : Pandas dataframe
+        Rating statistics
+    b : Pandas dataframe
+        Rating statistics
+
+    Returns
+    -------
+    Pandas dataframe
+        Rating statistics of the ratings in both
+    """
+
+    # Align movies
+    if not a.index.equals(b.index):
+        movies = a.index.union(b.index)
+        a, b = a.reindex(movies), b.reindex(movies)
+    na, nb = a['n'].fillna(0).values, b['n'].fillna(0).values
+    ma, mb = a['mean'].fillna(0).values, b['mean'].fillna(0).values
+
+    # Combine counts, means, and sums of squared deviations
+    n = na + nb
+    delta = mb - ma
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(n > 0, ma + delta * nb / n, np.nan)
+        m2 = a['m2'].fillna(0).values + b['m2'].fillna(0).values + delta ** 2 * na * nb / n
+
+    return pd.DataFrame({'n': n.astype(np.int64), 'mean': mean, 'm2': np.where(n > 0, m2, 0), 
+                         'first': np.fmin(a['first'].values, b['first'].values), 
+                         'last': np.fmax(a['last'].values, b['last'].values)}, 
+                        index=a.index)
+
+
+def count_ratings(ratings_df):
+
+    """
+    Count the number of times each movie got each rating.
 
     Parameters
     ----------
-    movies_df : Pandas dataframe
-        Joined movie data
     ratings_df : Pandas dataframe
         Kaggle rating data
 
     Returns
     -------
     Pandas dataframe
-        Movie data with aggregated (by count) rating data
+        Rating counts with `movieId` as the index and one column per rating 
+        (see `rating_histogram()`)
+    """
+
+    return rating_histogram(ratings_df['movieId'], ratings_df['rating'])
+
+
+def join_counts(movies_df, counts, count_dtype=None):
+
+    """
+    Merge rating counts by movie into the movie data.
+
+    Parameters
+    ----------
+    movies_df : Pandas dataframe
+        Joined movie data
+    counts : Pandas dataframe
+        Rating counts by movie from `count_ratings()` or 
+        `reduce_ratings_chunked()`
+    count_dtype : str, optional
+        Type to cast the rating counts to (e.g. `count_dtype` from the 
+        `config.data_vars` module), by default None. If None, the counts keep 
+        their type.
+
+    Returns
+    -------
+    Pandas dataframe
+        Movie data with aggregated (by count) rating data, with a count of 0 
+        for movies that weren't rated
     """
 
-    # Count ratings by movie
-    pivot = pd.pivot_table(data=ratings_df, index="movieId", columns='rating', 
-                           values='timestamp', aggfunc='count', fill_value=0).reset_index()
+    # Align rating counts to the movies by id, as a dense block
+    aligned = counts.reindex(np.asarray(movies_df['movie_id']), fill_value=0)
+    if count_dtype:
+        aligned = aligned.astype(count_dtype)
 
     # Rename columns
-    pivot.columns = ['movie_id'] + ['rating_' + str(rating) for rating in pivot.columns[1:]]
-    
-    # Merge aggregate rating data into movie data
-    df = pd.merge(movies_df, pivot, on='movie_id', how='left')
+    aligned.columns = ['rating_' + str(rating) for rating in counts.columns]
+    aligned.index = pd.RangeIndex(len(aligned))
 
-    # Fill missing rating counts with 0
-    for col in df.columns[-10:]:
-        df[col].fillna(0, inplace=True)
+    # Add aggregate rating data to movie data
+    return pd.concat([movies_df.reset_index(drop=True), aligned], axis=1)
+
+
+def join_stats(movies_df, stats):
+
+    """
+    Add rating statistics by movie to the movie data: the mean and (sample) 
+    variance of the ratings, the first and last rating times, and the number 
+    of ratings per month between the first and last rating (at least 1 
+    month).
+
+    Parameters
+    ----------
+    movies_df : Pandas dataframe
+        Joined movie data
+    stats : Pandas dataframe
+        Rating statistics by movie from `rating_stats()`, `merge_stats()`, or 
+        `reduce_ratings_chunked(..., return_stats=True)`
+
+    Returns
+    -------
+    Pandas dataframe
+        Movie data with rating statistics. Movies that weren't rated have 
+        missing statistics and 0 ratings per month.
+    """
+
+    # Align rating statistics to the movies by id
+    aligned = stats.reindex(np.asarray(movies_df['movie_id']))
+    n = aligned['n'].fillna(0).values
+
+    # Rating statistics
+    months = (aligned['last'] - aligned['first']) / pd.Timedelta(days=365.25 / 12)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cols = pd.DataFrame({
+            'rating_mean': aligned['mean'].values,
+            'rating_var': np.where(n > 1, aligned['m2'].values / (n - 1), np.nan),
+            'first_rating': aligned['first'].values,
+            'last_rating': aligned['last'].values,
+            'ratings_per_month': np.where(n > 0, n / np.fmax(months.values, 1), 0)
+        })
+
+    # Add rating statistics to movie data
+    df = movies_df.reset_index(drop=True)
+    return pd.concat([df, cols], axis=1)
+
+
+@profiling.staged('join_data')
+def join_data(movies_df, ratings_df, count_dtype=None, stats=False):
+
+    """
+    Aggregate rating counts (and optionally rating statistics) for each movie 
+    and merge the aggregate rating data into the movie data.
+
+    Parameters
+    ----------
+    movies_df : Pandas dataframe
+        Joined movie data
+    ratings_df : Pandas dataframe
+        Kaggle rating data
+    count_dtype : str, optional
+        Type to downcast the rating counts to (see `join_counts()`), by 
+        default None
+    stats : bool, optional
+        Whether to also add rating statistics (see `join_stats()`), by 
+        default False
+
+    Returns
+    -------
+    Pandas dataframe
+        Movie data with aggregated (by count) rating data
+    """
 
-    return df
\ No newline at end of file
+    # Count ratings by movie and merge them into the movie data
+    df = join_counts(movies_df, count_ratings(ratings_df), count_dtype)
+    if stats:
+        df = join_stats(df, rating_stats(ratings_df['movieId'], ratings_df['rating'], 
+                                         ratings_df['timestamp']))
+    return df
@@ -1,10 +1,68 @@
 import re
+from functools import lru_cache
+from collections import deque
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
 import numpy as np
 import pandas as pd
-from utils import udf_movies
+from utils import udf_movies, profiling
 from config.data_vars import keys_to_rename
 
 
+""" ### PATTERNS ### """
+
+
+# Regex patterns used to clean the Wikipedia data, compiled once at import
+patterns = {
+
+    # Scalar parsing: "$" / spaces / "," | seconds | "m" and spaces | "x hours xx"
+    'money_chars': re.compile(r'[\$\s,]'),
+    'seconds': re.compile(r'\:\s*\d{1,2}'),
+    'minute_chars': re.compile(r'm|\s*', re.IGNORECASE),
+    'hours': re.compile(r'(\d)(ho?u?r?s?)(\d\d?)?', re.IGNORECASE),
+
+    # Cleaning: date ranges | footnotes | amount ranges | numbered footnotes | duration ranges
+    'date_range': re.compile(r' [-–—] \d\d?'),
+    'footnote': re.compile(r'\[\s*(?:\w+\s*)*\]'),
+    'amount_range': re.compile(r'[-–—]\s?\$?\d+'),
+    'numbered_footnote': re.compile(r'\[\d\]'),
+    'duration_range': re.compile(r'[-–—]\s?\d+'),
+
+    # Release date formats: "(dd) month (dd), yyyy" | "yyyy(-mm-dd)"
+    'release_date': re.compile(r'((?:\d\d? )?[a-z]{3,9}(?: \d\d?)?,? \d{4}|'
+                               r'\d{4}(?:\D\d\d?\D\d\d?)?)', re.IGNORECASE),
+
+    # Release date format buckets (without commas): "dd month yyyy" | "month dd yyyy" | 
+    # "month yyyy" | "yyyy-mm-dd" | "yyyy", and separators of numeric dates
+    'day_month_year': re.compile(r'\d\d? [a-z]{3,9} \d{4}', re.IGNORECASE),
+    'month_day_year': re.compile(r'[a-z]{3,9} \d\d? \d{4}', re.IGNORECASE),
+    'month_year': re.compile(r'[a-z]{3,9} \d{4}', re.IGNORECASE),
+    'numeric_date': re.compile(r'\d{4}\D\d\d?\D\d\d?'),
+    'year_only': re.compile(r'\d{4}'),
+    'date_separator': re.compile(r'\D'),
+
+    # Budget formats: "xx.x mil" | "xxx,xxx"
+    'budget': re.compile(r'(\$?\s?\d{1,3}(?:\.\d+)?\s*mil|\$?\s?\d{1,3}(?:,\d{3})+)', 
+                         re.IGNORECASE),
+    'budget_parts': re.compile(r'\$?\s?(?P<mil>\d{1,3}(?:\.\d+)?)\s*mil|'
+                               r'\$?\s?(?P<num>\d{1,3}(?:,\d{3})+)', re.IGNORECASE),
+
+    # Box office formats: "xx.x k/m/b" | "xxx,xxx"
+    'box_office': re.compile(r'(\$?\s?\d{1,3}(?:\.\d+)?\s*[kmb]|'
+                             r'\$?\s?\d{1,3}(?:[\s\.,]?\d{3})+\$?)', re.IGNORECASE),
+    'box_office_parts': re.compile(r'\$?\s?(?P<scaled>\d{1,3}(?:\.\d+)?)\s*(?P<unit>[kmb])|'
+                                   r'\$?\s?(?P<num>\d{1,3}(?:[\s\.,]?\d{3})+)\$?', re.IGNORECASE),
+    'thousands_sep': re.compile(r'[\s\.,]'),
+
+    # Duration formats: "x hours xx m" | "xxx m" | "x hours" | "xx : xx"
+    'duration': re.compile(r'((?:\d\s*ho?u?r?s?\s*)?\d{1,3}\s*m|'
+                           r'\d\s*ho?u?r?s?|\d{1,2}\s*\:\s*\d{1,2})', re.IGNORECASE),
+    'duration_parts': re.compile(r'(?:(?P<hours>\d)\s*ho?u?r?s?\s*)?(?P<minutes>\d{1,3})\s*m|'
+                                 r'(?P<hours_only>\d)\s*ho?u?r?s?|(?P<clock>\d{1,2})\s*\:\s*\d{1,2}', 
+                                 re.IGNORECASE)
+}
+
+
 """ ### CLEANING ### """
 
 
@@ -64,6 +122,48 @@ def clean_movie(movie_dict, keys_to_rename=keys_to_rename):
     return clean_dict
 
 
+# Keys of which a movie record has at least 1 each, and keys of TV show records
+director_keys = {'Directed by', 'Director'}
+duration_keys = {'Duration', 'Length', 'Running time'}
+tv_show_keys = {'No. of seasons', 'No. of episodes'}
+
+
+def clean_movies(movie_data, keys_to_rename=keys_to_rename):
+
+    """
+    Filter the Wikipedia movie data for movies and clean each one in a single 
+    pass, yielding the clean records lazily. This gives the same records as 
+    `clean_movie()` applied to the output of `filter_for_movies()`, but the 
+    key sets and rename pairs are built once per call rather than per record, 
+    each record's keys are checked against whole key sets at once, and no 
+    intermediate list of filtered records is built.
+
+    Parameters
+    ----------
+    movie_data : iterable[dict]
+        Wikipedia movie data in JSON format
+    keys_to_rename : dict, optional
+        Mapping of old key name to new key name, by default `keys_to_rename` 
+        from the `config.data_vars` module
+
+    Yields
+    ------
+    Dict
+        Next clean movie record
+    """
+
+    rename_pairs = list(keys_to_rename.items())
+    for movie in movie_data:
+        keys = movie.keys()
+
+        # Skip TV shows and records missing movie keys
+        if 'imdb_link' in movie and not keys.isdisjoint(director_keys) and \
+                not keys.isdisjoint(duration_keys) and keys.isdisjoint(tv_show_keys):
+
+            # Rename the keys in the record that are in the list
+            yield {new: movie[old] for old, new in rename_pairs if old in movie}
+
+
 """ ### PARSING ### """
 
 
@@ -108,7 +208,7 @@ def parse_budget(s):
         return s
     
     # Remove $, spaces, and commas
-    s = re.sub(r'[\$\s,]', '', s).lower()
+    s = patterns['money_chars'].sub('', s).lower()
     
     # Convert to float
     if 'mil' in s:
@@ -138,7 +238,7 @@ def parse_box_office(s):
         return s
     
     # Remove $, spaces, and commas
-    s = re.sub(r'[\$\s,]', '', s).lower()
+    s = patterns['money_chars'].sub('', s).lower()
     
     # Convert to float
     if 'k' in s:
@@ -174,11 +274,11 @@ def parse_duration(s):
         return s
     
     # Remove seconds, "m", and spaces
-    s = re.sub(r'\:\s*\d{1,2}', '', s)
-    s = re.sub(r'm|\s*', '', s, flags=re.IGNORECASE)
+    s = patterns['seconds'].sub('', s)
+    s = patterns['minute_chars'].sub('', s)
     
     # Convert to int
-    match = re.search(r'(\d)(ho?u?r?s?)(\d\d?)?', s, flags=re.IGNORECASE)
+    match = patterns['hours'].search(s)
     if match: # if time is in hours
         i = int(match.group(1)) * 60 # hours to minutes
         if match.group(3):
@@ -187,10 +287,202 @@ def parse_duration(s):
         return int(s)
 
 
+""" ### VECTORIZED PARSING ### """
+
+
+# Multipliers for box office units
+units = {'k': 1e3, 'm': 1e6, 'b': 1e9}
+
+# Release date format buckets and the explicit formats each is parsed with
+date_buckets = {
+    'day_month_year': ['%d %B %Y', '%d %b %Y'],
+    'month_day_year': ['%B %d %Y', '%b %d %Y'],
+    'month_year': ['%B %Y', '%b %Y'],
+    'numeric_date': ['%Y-%m-%d'],
+    'year_only': ['%Y']
+}
+
+
+def parse_budget_parts(parts):
+
+    """
+    Vectorized version of `parse_budget()`. Convert the named groups extracted 
+    from the `budget` column with `patterns['budget_parts']` to numeric.
+
+    Parameters
+    ----------
+    parts : Pandas dataframe
+        Extracted `mil` and `num` groups
+
+    Returns
+    -------
+    Pandas series[float]
+        Numeric `budget` values
+    """
+
+    mil = parts['mil'].astype(float).to_numpy() * 1e6 # million
+    num = parts['num'].str.replace(',', '', regex=False).astype(float).to_numpy()
+    return pd.Series(np.where(parts['mil'].notnull(), mil, num), index=parts.index)
+
+
+def parse_box_office_parts(parts):
+
+    """
+    Vectorized version of `parse_box_office()`. Convert the named groups 
+    extracted from the `box_office` column with `patterns['box_office_parts']` 
+    to numeric.
+
+    Parameters
+    ----------
+    parts : Pandas dataframe
+        Extracted `scaled`, `unit`, and `num` groups
+
+    Returns
+    -------
+    Pandas series[float]
+        Numeric `box_office` values
+    """
+
+    # Amounts with a thousand/million/billion unit
+    scale = parts['unit'].str.lower().map(units).astype(float).to_numpy()
+    scaled = parts['scaled'].astype(float).to_numpy() * scale
+
+    # Amounts with (or without) ",", ".", or " " as thousand-separators
+    num = parts['num'].str.replace(patterns['thousands_sep'], '', regex=True).astype(float).to_numpy()
+
+    return pd.Series(np.where(parts['unit'].notnull(), scaled, num), index=parts.index)
+
+
+def parse_duration_parts(parts):
+
+    """
+    Vectorized version of `parse_duration()`. Convert the named groups 
+    extracted from the `duration` column with `patterns['duration_parts']` to 
+    numeric. As with `parse_duration()`, only the first 2 digits of the minutes 
+    are kept after hours, hours without minutes are missing, and the seconds 
+    of "xx : xx" values are dropped.
+
+    Parameters
+    ----------
+    parts : Pandas dataframe
+        Extracted `hours`, `minutes`, `hours_only`, and `clock` groups
+
+    Returns
+    -------
+    Pandas series[float]
+        Numeric `duration` values
+    """
+
+    hours = parts['hours'].astype(float).to_numpy()
+    minutes = parts['minutes'].astype(float).to_numpy()
+    hour_minutes = parts['minutes'].str[:2].astype(float).to_numpy()
+    clock = parts['clock'].astype(float).to_numpy()
+
+    # Pick the parsed value by format
+    conditions = [~np.isnan(hours), ~np.isnan(minutes), ~np.isnan(clock)]
+    choices = [hours * 60 + hour_minutes, minutes, clock]
+    return pd.Series(np.select(conditions, choices, np.nan), index=parts.index)
+
+
+@lru_cache(maxsize=65536)
+def parse_date(s):
+
+    """
+    Parse a date string that's in none of the `date_buckets` formats with 
+    `pd.to_datetime()`, which tries each format in turn. Results are cached 
+    since these strings are often repeated.
+
+    Parameters
+    ----------
+    s : str
+        Date string
+
+    Returns
+    -------
+    Pandas timestamp
+        Parsed date
+    """
+
+    return pd.to_datetime(s)
+
+
+def parse_dates(dates):
+
+    """
+    Vectorized date parsing. Each unique date string is classified into its 
+    format bucket (see `date_buckets`) and each bucket is parsed with its 
+    explicit formats in a single call per format. Strings in no bucket, or 
+    that their bucket's formats can't parse (e.g. "Sept"), are parsed with 
+    `parse_date()`.
+
+    Parameters
+    ----------
+    dates : Pandas series[obj]
+        Date strings extracted with `patterns['release_date']`
+
+    Returns
+    -------
+    Pandas series[datetime]
+        Parsed dates
+    """
+
+    # Parse each unique date string once
+    codes, uniques = pd.factorize(dates)
+    uniques = pd.Series(uniques, dtype=object)
+    clean = uniques.str.replace(',', '', regex=False)
+    parsed = pd.Series(pd.NaT, index=uniques.index, dtype='datetime64[ns]')
+
+    # Parse each format bucket with its explicit formats
+    unparsed = pd.Series(True, index=uniques.index)
+    for bucket, date_formats in date_buckets.items():
+        values = clean[unparsed & clean.str.fullmatch(patterns[bucket])]
+        unparsed[values.index] = False
+        if bucket == 'numeric_date':
+            values = values.str.replace(patterns['date_separator'], '-', regex=True)
+        for date_format in date_formats:
+            dates_parsed = pd.to_datetime(values, format=date_format, errors='coerce')
+            parsed[dates_parsed.index] = dates_parsed
+            values = values[dates_parsed.isnull()]
+
+    # Parse any other date strings one at a time
+    leftover = parsed.isnull()
+    parsed[leftover] = [parse_date(s) for s in uniques[leftover]]
+
+    # Map the parsed unique dates back to all the values
+    values = np.append(parsed.values, np.datetime64('NaT', 'ns'))[codes] # missing values are -1
+    return pd.Series(values, index=dates.index, name=dates.name)
+
+
 """ ### RECASTING ### """
 
 
-def release_date_to_dt(release_date):
+def drop_unmatched(values, formats):
+
+    """
+    Replace values that are not captured by any of the formats with NaN. This 
+    is done with a single masked assignment over the column.
+
+    Parameters
+    ----------
+    values : Pandas series[obj]
+        String column to check
+    formats : str or compiled regex
+        Pattern of the formats to keep (e.g. from `patterns`), matched 
+        case-insensitively if given as a string
+
+    Returns
+    -------
+    Pandas series[obj]
+        Column with values not captured by the formats replaced with NaN
+    """
+
+    if isinstance(formats, str):
+        formats = re.compile(formats, re.IGNORECASE)
+    matched = values.str.contains(formats, na=False)
+    return values.where(matched)
+
+
+def release_date_to_dt(release_date, vectorized=True):
 
     """
     Parse `release_date` in the Wikipedia data and convert it to datetime.
@@ -199,6 +491,9 @@ def release_date_to_dt(release_date):
     ----------
     release_date : Pandas series[obj]
         `release_date` column in the Wikipedia data
+    vectorized : bool, optional
+        Whether to parse with `parse_dates()` instead of calling 
+        `pd.to_datetime()` on the whole column, by default True
 
     Returns
     -------
@@ -211,22 +506,19 @@ def release_date_to_dt(release_date):
 
     # Select lower limit of date ranges
     release_date = release_date.str.strip() \
-                               .str.replace(r' [-–—] \d\d?', '', regex=True)
-
-    # Date formats
-    format1 = r'(?:\d\d? )?[a-z]{3,9}(?: \d\d?)?,? \d{4}'
-    format2 = r'\d{4}(?:\D\d\d?\D\d\d?)?'
-    formats = f'({format1}|{format2})'
+                               .str.replace(patterns['date_range'], '', regex=True)
 
     # Extract date from string
-    release_date = release_date.str.extract(formats, flags=re.IGNORECASE)[0]
+    release_date = release_date.str.extract(patterns['release_date'])[0]
 
     # Convert column to datetime type
-    release_date = pd.to_datetime(release_date, infer_datetime_format=True)
+    if vectorized:
+        return parse_dates(release_date)
+    release_date = pd.to_datetime(release_date)
     return release_date
 
 
-def budget_to_num(budget):
+def budget_to_num(budget, vectorized=True):
 
     """
     Parse `budget` in the Wikipedia data and convert it to numeric.
@@ -235,6 +527,9 @@ def budget_to_num(budget):
     ----------
     budget : Pandas series[obj]
         `budget` column in the Wikipedia data
+    vectorized : bool, optional
+        Whether to parse with `parse_budget_parts()` instead of applying 
+        `parse_budget()` to each value, by default True
 
     Returns
     -------
@@ -246,26 +541,22 @@ def budget_to_num(budget):
     budget = budget.apply(obj_to_str)
 
     # Clean string and select lower limit of amount ranges
-    budget = budget.str.strip().str.replace(r'\[\s*(?:\w+\s*)*\]', '', regex=True) \
-                               .str.replace(r'[-–—]\s?\$?\d+', '', regex=True)
-
-    # Budget formats
-    format1 = r'\$?\s?\d{1,3}(?:\.\d+)?\s*mil'
-    format2 = r'\$?\s?\d{1,3}(?:,\d{3})+'
-    formats = f'({format1}|{format2})'
+    budget = budget.str.strip().str.replace(patterns['footnote'], '', regex=True) \
+                               .str.replace(patterns['amount_range'], '', regex=True)
 
-    # Replace values not captured by these formats with NaN
-    contains = budget.dropna().str.contains(formats, flags=re.IGNORECASE)
-    for val in budget.dropna()[~contains].unique():
-        budget.replace(val, np.NaN, inplace=True)
+    # Replace values not captured by the budget formats with NaN
+    budget = drop_unmatched(budget, patterns['budget'])
 
     # Parse amount from string
-    budget = budget.str.extract(formats, flags=re.IGNORECASE)[0]
+    if vectorized:
+        parts = budget.str.extract(patterns['budget_parts'])
+        return parse_budget_parts(parts)
+    budget = budget.str.extract(patterns['budget'])[0]
     budget = budget.apply(parse_budget)
     return budget
 
 
-def box_office_to_num(box_office):
+def box_office_to_num(box_office, vectorized=True):
 
     """
     Parse `box_office` in the Wikipedia data and convert it to numeric.
@@ -274,6 +565,9 @@ def box_office_to_num(box_office):
     ----------
     box_office : Pandas series[obj]
         `box_office` column in the Wikipedia data
+    vectorized : bool, optional
+        Whether to parse with `parse_box_office_parts()` instead of applying 
+        `parse_box_office()` to each value, by default True
 
     Returns
     -------
@@ -284,23 +578,19 @@ def box_office_to_num(box_office):
     # Convert all values to strings
     box_office = box_office.apply(obj_to_str)
 
-    # Box office formats
-    format1 = r'\$?\s?\d{1,3}(?:\.\d+)?\s*[kmb]'
-    format2 = r'\$?\s?\d{1,3}(?:[\s\.,]?\d{3})+\$?'
-    formats = f'({format1}|{format2})'
-
-    # Replace values not captured by these formats with NaN
-    contains = box_office.dropna().str.contains(formats, flags=re.IGNORECASE)
-    for val in box_office.dropna()[~contains].unique():
-        box_office.replace(val, np.NaN, inplace=True)
+    # Replace values not captured by the box office formats with NaN
+    box_office = drop_unmatched(box_office, patterns['box_office'])
 
     # Parse amount from string
-    box_office = box_office.str.extract(formats, flags=re.IGNORECASE)[0]
+    if vectorized:
+        parts = box_office.str.extract(patterns['box_office_parts'])
+        return parse_box_office_parts(parts)
+    box_office = box_office.str.extract(patterns['box_office'])[0]
     box_office = box_office.apply(parse_box_office)
     return box_office
 
 
-def duration_to_num(duration):
+def duration_to_num(duration, vectorized=True):
 
     """
     Parse `duration` in the Wikipedia data and convert it to numeric.
@@ -309,6 +599,9 @@ def duration_to_num(duration):
     ----------
     duration : Pandas series[obj]
         `duration` column in the Wikipedia data
+    vectorized : bool, optional
+        Whether to parse with `parse_duration_parts()` instead of applying 
+        `parse_duration()` to each value, by default True
 
     Returns
     -------
@@ -320,25 +613,22 @@ def duration_to_num(duration):
     duration = duration.apply(obj_to_str)
 
     # Clean string and select lower limit of duration ranges
-    duration = duration.str.strip().str.replace(r'\[\d\]', '', regex=True) \
-                                   .str.replace(r'[-–—]\s?\d+', '', regex=True)
-
-    # Duration formats
-    format1 = r'(?:\d\s*ho?u?r?s?\s*)?\d{1,3}\s*m'
-    format2 = r'\d\s*ho?u?r?s?|\d{1,2}\s*\:\s*\d{1,2}'
-    formats = f'({format1}|{format2})'
+    duration = duration.str.strip().str.replace(patterns['numbered_footnote'], '', regex=True) \
+                                   .str.replace(patterns['duration_range'], '', regex=True)
 
-    # Replace values not captured by these formats with NaN
-    contains = duration.dropna().str.contains(formats, flags=re.IGNORECASE)
-    for val in duration.dropna()[~contains].unique():
-        duration.replace(val, np.NaN, inplace=True)
+    # Replace values not captured by the duration formats with NaN
+    duration = drop_unmatched(duration, patterns['duration'])
 
     # Parse duration from string
-    duration = duration.str.extract(formats, flags=re.IGNORECASE)[0]
+    if vectorized:
+        parts = duration.str.extract(patterns['duration_parts'])
+        return parse_duration_parts(parts)
+    duration = duration.str.extract(patterns['duration'])[0]
     duration = duration.apply(parse_duration)
     return duration
 
 
+@profiling.staged('recast_wiki_columns')
 def recast_wiki_columns(wiki_data):
 
     """
@@ -360,17 +650,55 @@ def recast_wiki_columns(wiki_data):
     """
 
     # Recast columns
-    wiki_data['release_date'] = release_date_to_dt(wiki_data['release_date'])
-    wiki_data['budget'] = budget_to_num(wiki_data['budget'])
-    wiki_data['box_office'] = box_office_to_num(wiki_data['box_office'])
-    wiki_data['duration'] = duration_to_num(wiki_data['duration'])
+    for col, recast in [('release_date', release_date_to_dt), ('budget', budget_to_num), 
+                        ('box_office', box_office_to_num), ('duration', duration_to_num)]:
+        with profiling.stage(col, rows_in=wiki_data.shape[0]) as rows:
+            wiki_data[col] = recast(wiki_data[col])
+            rows['rows_out'] = int(wiki_data[col].notna().sum()) # values parsed
     return wiki_data
 
 
 """ ### PIPELINE ### """
 
 
-def clean_wiki_movies(wiki_movies):
+def clean_wiki_shard(wiki_movies):
+
+    """
+    Filter, clean, and recast 1 shard of the Wikipedia movie JSON data. This 
+    is the per-record part of `clean_wiki_movies()` run by each worker when 
+    cleaning in parallel. Duplicate rows are not dropped here since duplicates 
+    can span shards.
+
+    Parameters
+    ----------
+    wiki_movies : list[dict]
+        Shard of the Wikipedia movie data in JSON format
+
+    Returns
+    -------
+    Pandas dataframe
+        Clean, recasted shard of the Wikipedia movie data
+    List[str]
+        Columns found in the shard's records, in order of appearance
+    """
+
+    # Filter for movies, clean them, and convert to dataframe
+    movies_df = pd.DataFrame(clean_movies(wiki_movies))
+    columns = movies_df.columns.tolist()
+
+    # Add any recasted columns missing from this shard as empty strings, which 
+    # are recasted to missing values (an all-NaN column can't be parsed as strings)
+    for col in ['release_date', 'budget', 'box_office', 'duration']:
+        if col not in movies_df.columns:
+            movies_df[col] = pd.Series('', index=movies_df.index, dtype=object)
+
+    # Recast columns to appropriate data types
+    movies_df = recast_wiki_columns(movies_df)
+    return movies_df, columns
+
+
+@profiling.staged('clean_wiki_movies')
+def clean_wiki_movies(wiki_movies, n_workers=None, shard_size=10000):
 
     """
     Clean the Wikipedia movie JSON data with the following steps:
@@ -382,8 +710,19 @@ def clean_wiki_movies(wiki_movies):
 
     Parameters
     ----------
-    wiki_movies : list[dict]
-        Wikipedia movie data in JSON format
+    wiki_movies : list[dict] or iterator[dict]
+        Wikipedia movie data in JSON format, or an iterator over its records 
+        (e.g. from `formats.iter_json()`), in which case records are filtered 
+        and cleaned as they're read and only the movies are kept in memory
+    n_workers : int, optional
+        Number of worker processes, by default None. If more than 1, the data 
+        is split into shards that are filtered, cleaned, and recasted in 
+        parallel (see `clean_wiki_shard()`), then duplicate rows are dropped 
+        from the combined shards. Otherwise, the data is cleaned in this 
+        process.
+    shard_size : int, optional
+        Number of records per shard when cleaning an iterator in parallel, by 
+        default 10000. A list is split into `n_workers` shards instead.
 
     Returns
     -------
@@ -391,12 +730,35 @@ def clean_wiki_movies(wiki_movies):
         Clean Wikipedia movie data
     """
 
-    # Filter for movies
-    movies = filter_for_movies(wiki_movies)
+    # Clean shards in parallel
+    if n_workers and n_workers > 1:
+
+        # Contiguous shards of a list, or consecutive shards of an iterator
+        if isinstance(wiki_movies, list):
+            shard_size = -(-len(wiki_movies) // n_workers) or 1 # ceiling division
+            shards = (wiki_movies[i:i + shard_size] for i in range(0, len(wiki_movies), shard_size))
+        else:
+            records = iter(wiki_movies)
+            shards = iter(lambda: list(islice(records, shard_size)), [])
+
+        # Only keep a few shards in flight so an iterator is read as needed
+        results, pending = [], deque()
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            for shard in shards:
+                pending.append(executor.submit(clean_wiki_shard, shard))
+                if len(pending) >= 2 * n_workers:
+                    results.append(pending.popleft().result())
+            results.extend(future.result() for future in pending)
+
+        # Combine shards with columns in order of first appearance
+        columns = list(dict.fromkeys(col for _, cols in results for col in cols))
+        movies_df = pd.concat([df for df, _ in results], ignore_index=True)[columns]
+
+        # Drop duplicate rows across shards
+        return udf_movies.drop_duplicates(movies_df)
 
-    # Clean movies and convert to dataframe
-    movies = [clean_movie(movie) for movie in movies]
-    movies_df = pd.DataFrame(movies)
+    # Filter for movies, clean them, and convert to dataframe
+    movies_df = pd.DataFrame(clean_movies(wiki_movies))
 
     # Drop duplicate rows
     movies_df = udf_movies.drop_duplicates(movies_df)
@@ -404,4 +766,4 @@ def clean_wiki_movies(wiki_movies):
     # Recast columns to appropriate data types
     movies_df = recast_wiki_columns(movies_df)
 
-    return movies_df
\ No newline at end of file
+    return movies_df